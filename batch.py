@@ -0,0 +1,153 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Challenge Editor - Edits NSMBU's challenge data file.
+# Copyright (C) 2016 Grop
+
+# batch.py
+# Headless tool that queries and patches many challenge data files at once
+
+################################################################
+################################################################
+
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+
+from exbin import FieldNames, FieldRanges, File, NumpyFile, compileExpression, entryValues, evalExpression, loadNumpy, replayJournal
+from courses import scanCourses
+from validate import Validator, formatProblem
+
+
+def parseAssignment(text):
+    """Parses a 'field=expression' assignment"""
+    name, sep, value = text.partition('=')
+    name = name.strip()
+    if not sep or name not in FieldNames:
+        raise ValueError('Expected field=expression, got %r' % text)
+    return name, value
+
+
+def processFile(fp, where, assignments, write, check=False, courses=None):
+    """Runs a query/patch over one file; returns (fp, matching challenges, number patched, problems)"""
+    # Expressions are compiled per process, code objects can't be pickled
+    where = compileExpression(where) if where else None
+    assignments = [(name, compileExpression(value)) for name, value in assignments]
+
+    if write:
+        replayJournal(fp)
+    with open(fp, 'rb') as file:
+        data = file.read()
+    challengefile = File(data)
+
+    matches = []
+    for index, challenge in enumerate(challengefile.challenges):
+        values = entryValues(challenge, index)
+        if where is not None and not evalExpression(where, values):
+            continue
+
+        for name, code in assignments:
+            value = int(evalExpression(code, values))
+            low, high = FieldRanges[name]
+            if not low <= value <= high:
+                raise ValueError('challenge %d: %s=%d is not between %d and %d' % (index, name, value, low, high))
+            setattr(challenge, name, value)
+        if assignments:
+            values = entryValues(challenge, index)
+        matches.append(values)
+
+    patched = len(challengefile.dirtyIndices())
+    if write and patched:
+        challengefile.saveIncremental(fp)
+
+    problems = []
+    if check:
+        # Checked over whole columns when NumPy is there
+        checkfile = NumpyFile(challengefile.save()) if loadNumpy() else challengefile
+        validator = Validator(checkfile, courses=courses)
+        problems = validator.sortedProblems()
+        validator.close()
+    return fp, matches, patched, problems
+
+
+def findFiles(paths):
+    """Expands directories into the .exbin files below them"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith('.exbin'):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def main(args=None):
+    """Batch tool startup function"""
+    parser = argparse.ArgumentParser(prog='batch.py', description='Query and patch NSMBU challenge data files without the GUI.')
+    parser.add_argument('paths', nargs='+', help='.exbin files, or directories to search for them')
+    parser.add_argument('-w', '--where', help="select challenges, e.g. 'catid==0 and world==3' (fields, plus 0-based 'index')")
+    parser.add_argument('-s', '--set', action='append', default=[], metavar='FIELD=EXPR', help="set a field on the selected challenges, e.g. 'time=time+30'")
+    parser.add_argument('-d', '--dump', action='store_true', help='print the selected challenges')
+    parser.add_argument('--json', action='store_true', help='print JSON lines instead of text')
+    parser.add_argument('-c', '--check', action='store_true', help='check the (patched) challenges for problems')
+    parser.add_argument('--courses', metavar='DIR', help="with -c, also check each challenge's level, area and entrance against the .szs files in the game's course folder")
+    parser.add_argument('-n', '--dry-run', action='store_true', help="don't write the patched files")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (default: all cores)')
+    args = parser.parse_args(args)
+
+    try:
+        if args.where: compileExpression(args.where)
+        assignments = [parseAssignment(a) for a in args.set]
+        for name, value in assignments: compileExpression(value)
+    except (ValueError, SyntaxError) as e:
+        parser.error(str(e))
+
+    courses = None
+    if args.courses:
+        if not args.check:
+            parser.error('--courses needs -c')
+        courses = scanCourses(args.courses, args.jobs)
+
+    files = list(findFiles(args.paths))
+    write = bool(assignments) and not args.dry_run
+    total = 0
+    failed = 0
+    errors = 0
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(processFile, fp, args.where, assignments, write, args.check, courses) for fp in files]
+        for fp, future in zip(files, futures):
+            try:
+                fp, matches, patched, problems = future.result()
+            except Exception as e:
+                print('%s: error: %s' % (fp, e), file=sys.stderr)
+                failed += 1
+                continue
+
+            total += len(matches)
+            if args.dump:
+                for values in matches:
+                    if args.json:
+                        values = dict(values, file=fp)
+                        print(json.dumps(values))
+                    else:
+                        print('%s:%d %s' % (fp, values['index'], ' '.join('%s=%d' % (name, values[name]) for name in FieldNames)))
+            if patched:
+                print('%s: %s %d challenge(s)' % (fp, 'patched' if write else 'would patch', patched), file=sys.stderr)
+            for problem in problems:
+                print('%s:%s' % (fp, formatProblem(problem)))
+                if problem.severity == 'error':
+                    errors += 1
+
+    print('%d challenge(s) matched in %d file(s)' % (total, len(files) - failed), file=sys.stderr)
+    if args.check:
+        print('%d error(s) found' % errors, file=sys.stderr)
+    return 1 if failed or errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,287 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Challenge Editor - Edits NSMBU's challenge data file.
+# Copyright (C) 2016 Grop
+
+# benchmark.py
+# Measures the editor's startup time, headless and with the GUI, parse and
+# save throughput, and the latency of the main GUI operations. Results can be
+# appended to a JSON Lines history and compared with the previous run.
+
+################################################################
+################################################################
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+Here = os.path.dirname(os.path.abspath(__file__))
+
+# Each of these runs in a fresh interpreter and prints its timings as JSON
+HeadlessStartup = '''
+import json, sys, time
+t0 = time.perf_counter()
+import exbin
+t1 = time.perf_counter()
+with open(sys.argv[1], 'rb') as file:
+    exbin.File(file.read())
+t2 = time.perf_counter()
+print(json.dumps({'import': t1 - t0, 'first parse': t2 - t1}))
+'''
+
+GuiStartup = '''
+import json, sys, time
+t0 = time.perf_counter()
+import exbin
+from PyQt5 import QtWidgets
+import gui
+t1 = time.perf_counter()
+app = QtWidgets.QApplication(sys.argv[:1])
+window = gui.MainWindow()
+app.processEvents()
+t2 = time.perf_counter()
+with open(sys.argv[1], 'rb') as file:
+    window.view.setFile(exbin.File(file.read()))
+app.processEvents()
+t3 = time.perf_counter()
+view = window.view
+rows = view.model.rowCount()
+for row in list(range(1, rows)) + [0]:
+    view.ChallengeList.setCurrentIndex(view.model.index(row))
+    app.processEvents()
+t4 = time.perf_counter()
+print(json.dumps({'import': t1 - t0, 'window': t2 - t1, 'first parse': t3 - t2, 'switch': (t4 - t3) / max(1, rows)}))
+'''
+
+# Average time of each GUI operation, including the events it queues
+GuiOperations = '''
+import json, sys, time
+import exbin
+from PyQt5 import QtWidgets
+import gui
+app = QtWidgets.QApplication(sys.argv[:1])
+window = gui.MainWindow()
+view = window.view
+app.processEvents()
+with open(sys.argv[1], 'rb') as file:
+    data = file.read()
+
+def timed(function, number):
+    start = time.perf_counter()
+    for i in range(number):
+        function(i)
+        app.processEvents()
+    return (time.perf_counter() - start) / number
+
+files = [exbin.File(data) for i in range(20)]
+results = {'setFile': timed(lambda i: view.setFile(files[i]), len(files))}
+rows = view.model.rowCount()
+results['HandleDifferentChallenge'] = timed(lambda i: view.HandleDifferentChallenge(view.model.index(i % rows), view.model.index(0)), rows)
+
+def updateFields(i):
+    # updateFields shows view.challenge, whatever it is passed
+    view.challenge = i % rows
+    view.updateFields(view.challenge)
+
+results['updateFields'] = timed(updateFields, rows)
+results['addStar/removeStar'] = timed(lambda i: (view.removeStar if view.shownStars == 5 else view.addStar)(False), 100)
+print(json.dumps(results))
+'''
+
+
+def syntheticFile(count=80, seed=None):
+    """Returns the data of a challenge file with count challenges, empty or,
+    with a seed, filled with random small values"""
+    from exbin import Entry, FieldNames, File
+
+    challengefile = File()
+    if seed is None:
+        challengefile.challenges = [Entry() for i in range(count)]
+    else:
+        rng = random.Random(seed)
+        challengefile.challenges = [Entry([rng.randrange(1000) for name in FieldNames]) for i in range(count)]
+    return bytes(challengefile.save())
+
+
+def timeStartup(code, fp, runs):
+    """Runs code in fresh interpreters; returns the median of each timing, plus the process wall time"""
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+
+    results = {}
+    for i in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', code, fp], cwd=Here, env=env, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        wall = time.perf_counter() - start
+
+        timings = json.loads(out.strip().splitlines()[-1])
+        timings['process'] = wall
+        for name, value in timings.items():
+            results.setdefault(name, []).append(value)
+
+    return dict((name, statistics.median(values)) for name, values in results.items())
+
+
+def bestTime(function, number, runs):
+    """Returns the best time of one call to function, over runs batches of number calls"""
+    return min(timeit.Timer(function).repeat(repeat=runs, number=number)) / number
+
+
+def timeModel(data, corpus, runs):
+    """Times parsing and saving a file and its records, and a corpus of files"""
+    from exbin import Entry, File
+
+    challengefile = File(data)
+    layout = challengefile.layout
+    records = [challenge.save(layout) for challenge in challengefile.challenges]
+    values = [layout.entryStruct.unpack(record) for record in records]
+    entries = [Entry(v) for v in values]
+    count = max(1, len(records))
+    number = max(1, 20000 // count)
+
+    def loadEntries():
+        for entry, v in zip(entries, values):
+            entry.load(v)
+
+    def saveEntries():
+        for entry in entries:
+            entry.save(layout)
+
+    corpusdata = [syntheticFile(len(records), seed) for seed in range(corpus)]
+    corpusfiles = [File(d) for d in corpusdata]
+
+    def parseCorpus():
+        for d in corpusdata:
+            File(d)
+
+    def saveCorpus():
+        for f in corpusfiles:
+            f.save()
+
+    return {
+        'File.initFromData': bestTime(lambda: challengefile.initFromData(data), number, runs),
+        'File.save': bestTime(challengefile.save, number, runs),
+        'Entry.load': bestTime(loadEntries, number, runs) / count,
+        'Entry.save': bestTime(saveEntries, number, runs) / count,
+        'corpus parse': bestTime(parseCorpus, 1, runs),
+        'corpus save': bestTime(saveCorpus, 1, runs),
+        }
+
+
+def formatTime(seconds):
+    """Returns a time in ms, or in us if it's under a millisecond"""
+    if seconds < 0.001:
+        return '%10.2f us' % (seconds * 1000000)
+    return '%10.2f ms' % (seconds * 1000)
+
+
+def flatten(results):
+    """Returns {'group/name': seconds} for nested results"""
+    return dict(('%s/%s' % (group, name), value) for group, timings in results.items() for name, value in timings.items())
+
+
+def readHistory(fp):
+    """Returns the entries of a history file"""
+    if not os.path.exists(fp):
+        return []
+    with open(fp) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def gitCommit():
+    """Returns the checked out commit, or None"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Here, check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(previous, results, threshold):
+    """Returns (name, old, new) for the timings more than threshold (a fraction) slower than before"""
+    old = flatten(previous['results'])
+    slower = []
+    for name, value in sorted(flatten(results).items()):
+        if name in old and old[name] > 0 and value > old[name] * (1 + threshold):
+            slower.append((name, old[name], value))
+    return slower
+
+
+def main(args=None):
+    """Benchmark startup function"""
+    parser = argparse.ArgumentParser(prog='benchmark.py', description='Measures Challenge Editor startup time, parse/save throughput and GUI latency.')
+    parser.add_argument('file', nargs='?', help='.exbin file to parse (default: a synthetic one)')
+    parser.add_argument('-r', '--runs', type=int, default=10, help='number of fresh processes per path, or repeats of each timing (default: 10)')
+    parser.add_argument('--records', type=int, default=80, help='challenges in the synthetic files (default: 80)')
+    parser.add_argument('--corpus', type=int, default=200, help='number of synthetic files in the corpus timings (default: 200)')
+    parser.add_argument('--no-gui', action='store_true', help="don't measure the GUI path")
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    parser.add_argument('--history', metavar='JSONL', help='append the results to this history file and compare them with the last entry')
+    parser.add_argument('--max-regression', type=float, default=None, metavar='PERCENT', help='with --history, exit with 1 if a timing got this much slower')
+    args = parser.parse_args(args)
+
+    fp = args.file
+    if fp is None:
+        with tempfile.NamedTemporaryFile(suffix='.exbin', delete=False) as file:
+            file.write(syntheticFile(args.records, 0))
+        fp = file.name
+
+    try:
+        with open(fp, 'rb') as file:
+            data = file.read()
+        results = {'headless': timeStartup(HeadlessStartup, fp, args.runs)}
+        results['model'] = timeModel(data, args.corpus, args.runs)
+        if not args.no_gui:
+            results['gui'] = timeStartup(GuiStartup, fp, args.runs)
+            results['gui operations'] = timeStartup(GuiOperations, fp, max(1, args.runs // 3))
+    finally:
+        if args.file is None:
+            os.remove(fp)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for group, timings in results.items():
+            print('%s (%s):' % (group, 'best of %d repeats' % args.runs if group == 'model' else 'median of fresh processes'))
+            for name, value in timings.items():
+                print('  %-26s %s' % (name, formatTime(value)))
+
+    status = 0
+    if args.history:
+        from exbin import recordCount
+        entry = {
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': gitCommit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'file': args.file,
+            'records': recordCount(len(data)),
+            'corpus': args.corpus,
+            'results': results,
+            }
+        # Only compare with a run of the same kind on the same machine
+        previous = [e for e in readHistory(args.history) if all(e.get(key) == entry[key] for key in ('platform', 'file', 'records', 'corpus'))]
+        if previous:
+            threshold = (args.max_regression if args.max_regression is not None else 10) / 100
+            slower = regressions(previous[-1], results, threshold)
+            for name, old, new in slower:
+                print('slower than %s: %s %s -> %s (%+.0f%%)' % (previous[-1].get('commit') or previous[-1]['time'], name, formatTime(old).strip(), formatTime(new).strip(), (new / old - 1) * 100), file=sys.stderr)
+            if slower and args.max_regression is not None:
+                status = 1
+        with open(args.history, 'a') as file:
+            file.write(json.dumps(entry) + '\n')
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
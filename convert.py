@@ -0,0 +1,318 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Challenge Editor - Edits NSMBU's challenge data file.
+# Copyright (C) 2016 Grop
+
+# convert.py
+# Exports challenge data files to CSV, JSON Lines, NumPy .npz or Parquet, and
+# imports them back. Records are streamed one chunk at a time, except for .npz,
+# which NumPy writes a whole column at a time. Also converts challenge files
+# between the big- and little-endian layouts.
+
+################################################################
+################################################################
+
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+
+from exbin import BigEndian, DefaultHeader, EntryFields, FieldNames, FieldRanges, HeaderSize, Layouts, convertData, detectLayout, loadNumpy, openAtomic, readFile, recordCount, writeAtomic
+import exbin
+
+Formats = {'.csv': 'csv', '.jsonl': 'jsonl', '.json': 'jsonl', '.npz': 'npz', '.parquet': 'parquet'}
+
+# Columns besides the fields: the record's index in its file, and the path of
+# the file when more than one is exported. Both are ignored on import.
+ExtraColumns = ('path', 'index')
+
+RecordsPerChunk = 1024
+
+
+def formatOf(fp, format=None):
+    """Returns the format to use for a path, from its extension unless given"""
+    if format is not None:
+        return format
+    format = Formats.get(os.path.splitext(fp)[1].lower())
+    if format is None:
+        raise ValueError('Unknown format for %s, expected one of %s' % (fp, ', '.join(sorted(Formats))))
+    return format
+
+
+def iterRecords(fp):
+    """Yields the field values of each record of a challenge file"""
+    with open(fp, 'rb') as file:
+        chunk = file.read(HeaderSize + (RecordsPerChunk * BigEndian.stride))
+        if len(chunk) < HeaderSize:
+            return
+        layout = detectLayout(chunk)
+        stride = layout.stride
+        chunk = chunk[HeaderSize:]
+        while True:
+            whole = len(chunk) - (len(chunk) % stride)
+            yield from layout.entryStruct.iter_unpack(memoryview(chunk)[:whole])
+            more = file.read(RecordsPerChunk * stride)
+            if not more:
+                return
+            chunk = chunk[whole:] + more
+
+
+def iterRows(files, withFile):
+    """Yields the export rows of some challenge files"""
+    for fp in files:
+        for index, values in enumerate(iterRecords(fp)):
+            yield ((fp, index) if withFile else (index,)) + values
+
+
+def loadArrow():
+    """Imports pyarrow for Parquet files"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError('Parquet files need pyarrow')
+    return pyarrow
+
+
+def checkNumpy():
+    """Makes sure NumPy is there for .npz files"""
+    if not loadNumpy():
+        raise ValueError('.npz files need NumPy')
+
+
+# Export
+
+def writeCsv(dst, columns, rows):
+    """Writes rows as CSV"""
+    with open(dst, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+
+def writeJsonLines(dst, columns, rows):
+    """Writes rows as one JSON object per line"""
+    with open(dst, 'w') as file:
+        for row in rows:
+            file.write(json.dumps(dict(zip(columns, row))) + '\n')
+
+
+def writeParquet(dst, columns, rows):
+    """Writes rows as Parquet, one row group per chunk of records"""
+    pa = loadArrow()
+    types = dict((field.name, pa.uint32() if field.type == 'I' else pa.int32()) for field in EntryFields)
+    types.update(path=pa.string(), index=pa.uint32())
+    schema = pa.schema([(name, types[name]) for name in columns])
+
+    with pa.parquet.ParquetWriter(dst, schema) as writer:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == RecordsPerChunk:
+                writer.write_batch(pa.record_batch([list(column) for column in zip(*chunk)], schema=schema))
+                chunk = []
+        if chunk:
+            writer.write_batch(pa.record_batch([list(column) for column in zip(*chunk)], schema=schema))
+
+
+def writeNpz(dst, columns, files):
+    """Writes the records of some files as one NumPy array per column"""
+    checkNumpy()
+    numpy = exbin.numpy
+    parts = dict((name, []) for name in columns)
+    for fp in files:
+        data = readFile(fp)
+        if len(data) < HeaderSize:
+            # Like iterRecords, a file too short for its header has no records
+            continue
+        layout = detectLayout(data)
+        count = recordCount(len(data), layout.stride)
+        records = numpy.frombuffer(data, layout.dtype(), count, HeaderSize)
+        for name in FieldNames:
+            parts[name].append(records[name].astype(records.dtype[name].newbyteorder('=')))
+        parts['index'].append(numpy.arange(count, dtype=numpy.uint32))
+        if 'path' in parts:
+            parts['path'].append(numpy.full(count, fp))
+
+    arrays = {}
+    for name in columns:
+        arrays[name] = numpy.concatenate(parts[name]) if parts[name] else numpy.zeros(0, numpy.uint32)
+    numpy.savez(dst, **arrays)
+
+
+def exportFiles(files, dst, format=None):
+    """Exports the challenges of some files to one file; returns how many
+    records were written. With more than one file, a 'path' column says
+    which one each record came from."""
+    format = formatOf(dst, format)
+    withFile = len(files) > 1
+    columns = (ExtraColumns if withFile else ExtraColumns[1:]) + FieldNames
+
+    if format == 'npz':
+        writeNpz(dst, columns, files)
+    else:
+        writer = {'csv': writeCsv, 'jsonl': writeJsonLines, 'parquet': writeParquet}[format]
+        writer(dst, columns, iterRows(files, withFile))
+    return sum(recordCount(os.path.getsize(fp)) for fp in files)
+
+
+# Import
+
+def readCsv(src):
+    """Yields the rows of a CSV file"""
+    with open(src, newline='') as file:
+        yield from csv.DictReader(file)
+
+
+def readJsonLines(src):
+    """Yields the rows of a JSON Lines file"""
+    with open(src) as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def readParquet(src):
+    """Yields the rows of a Parquet file, one row group at a time"""
+    pa = loadArrow()
+    for batch in pa.parquet.ParquetFile(src).iter_batches(batch_size=RecordsPerChunk):
+        yield from batch.to_pylist()
+
+
+def packRow(row, number, layout=BigEndian):
+    """Checks an imported row and returns it packed as a record"""
+    unknown = set(row).difference(FieldNames, ExtraColumns)
+    if unknown:
+        raise ValueError('row %d: unknown column %s' % (number, ', '.join(sorted(unknown))))
+
+    values = []
+    for name in FieldNames:
+        if name not in row:
+            raise ValueError('row %d: no %s' % (number, name))
+        value = row[name]
+        # Fractions are refused rather than cut off, as .npz float columns are
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError('row %d: %s is not a whole number: %r' % (number, name, value))
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValueError('row %d: %s is not a number: %r' % (number, name, row[name]))
+        low, high = FieldRanges[name]
+        if not low <= value <= high:
+            raise ValueError('row %d: %s must be between %d and %d' % (number, name, low, high))
+        values.append(value)
+    return layout.entryStruct.pack(*values)
+
+
+def packNpz(src, layout=BigEndian):
+    """Checks the columns of a .npz file and returns them packed as records"""
+    checkNumpy()
+    numpy = exbin.numpy
+    with numpy.load(src) as arrays:
+        unknown = set(arrays.files).difference(FieldNames, ExtraColumns)
+        if unknown:
+            raise ValueError('unknown column %s' % ', '.join(sorted(unknown)))
+        missing = [name for name in FieldNames if name not in arrays.files]
+        if missing:
+            raise ValueError('no %s' % ', '.join(missing))
+
+        records = numpy.zeros(len(arrays[FieldNames[0]]), layout.dtype())
+        for name in FieldNames:
+            column = arrays[name]
+            if len(column) != len(records) or column.dtype.kind not in 'iu':
+                raise ValueError('%s is not a whole number column as long as the others' % name)
+            low, high = FieldRanges[name]
+            bad = numpy.nonzero((column < low) | (column > high))[0]
+            if len(bad):
+                raise ValueError('row %d: %s must be between %d and %d' % (bad[0] + 1, name, low, high))
+            records[name] = column
+    return records.tobytes()
+
+
+def importFile(src, dst, format=None, header=DefaultHeader, layout=BigEndian):
+    """Packs the rows of an exported file into a challenge file in a layout,
+    in order; returns how many records were written. dst is only replaced if
+    every row is valid."""
+    format = formatOf(src, format)
+    count = 0
+    with openAtomic(dst) as file:
+        file.write(layout.headerStruct.pack(*header))
+        if format == 'npz':
+            data = packNpz(src, layout)
+            file.write(data)
+            count = len(data) // layout.stride
+        else:
+            reader = {'csv': readCsv, 'jsonl': readJsonLines, 'parquet': readParquet}[format]
+            for row in reader(src):
+                count += 1
+                file.write(packRow(row, count, layout))
+    return count
+
+
+# Byte order
+
+def recodeFile(src, dst, target, source=None):
+    """Converts a challenge file to another layout, detecting the one it is
+    in unless source is given; returns the source layout"""
+    data = readFile(src)
+    if source is None:
+        source = detectLayout(data)
+    writeAtomic(dst, convertData(data, source, target))
+    return source
+
+
+def main(args=None):
+    """Export/import tool startup function"""
+    from batch import findFiles
+
+    parser = argparse.ArgumentParser(prog='convert.py', description='Converts NSMBU challenge data files to and from CSV, JSON Lines, .npz and Parquet.')
+    sub = parser.add_subparsers(dest='command')
+    sub.required = True
+
+    e = sub.add_parser('export', help='export the challenges of one or more files')
+    e.add_argument('paths', nargs='+', help='.exbin files, or directories to search for them')
+    e.add_argument('-o', '--output', required=True, help='file to write (.csv, .jsonl, .npz or .parquet)')
+    e.add_argument('-f', '--format', choices=sorted(set(Formats.values())), help='format to write (default: from the extension)')
+
+    i = sub.add_parser('import', help='pack exported challenges into a challenge file')
+    i.add_argument('input', help='file to read (.csv, .jsonl, .npz or .parquet)')
+    i.add_argument('-o', '--output', required=True, help='.exbin file to write')
+    i.add_argument('-f', '--format', choices=sorted(set(Formats.values())), help='format to read (default: from the extension)')
+    i.add_argument('--header-from', metavar='EXBIN', help='copy the header words from this file (default: the CAFE header)')
+    i.add_argument('--layout', choices=list(Layouts), default=BigEndian.name, help='byte order to write (default: big, as on the Wii U)')
+
+    r = sub.add_parser('recode', help='convert a challenge file to another byte order')
+    r.add_argument('input', help='.exbin file to read')
+    r.add_argument('-o', '--output', required=True, help='.exbin file to write')
+    r.add_argument('--to', required=True, choices=list(Layouts), help='byte order to write')
+    r.add_argument('--from', dest='source', choices=list(Layouts), help='byte order of the input (default: detected)')
+    args = parser.parse_args(args)
+
+    try:
+        if args.command == 'export':
+            files = list(findFiles(args.paths))
+            count = exportFiles(files, args.output, args.format)
+            print('%d challenge(s) from %d file(s) exported' % (count, len(files)), file=sys.stderr)
+        elif args.command == 'import':
+            header = DefaultHeader
+            if args.header_from:
+                with open(args.header_from, 'rb') as file:
+                    data = file.read(HeaderSize)
+                header = detectLayout(data).headerStruct.unpack(data)
+            count = importFile(args.input, args.output, args.format, header, Layouts[args.layout])
+            print('%d challenge(s) imported' % count, file=sys.stderr)
+        else:
+            target = Layouts[args.to]
+            source = recodeFile(args.input, args.output, target, args.source and Layouts[args.source])
+            print('%s converted from %s-endian to %s-endian' % (args.input, source.name, target.name), file=sys.stderr)
+    except (OSError, ValueError, struct.error) as e:
+        print('error: %s' % e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Challenge Editor - Edits NSMBU's challenge data file.
+# Copyright (C) 2016 Grop
+
+# courses.py
+# Reads the game's course folder, so challenges can be checked against the
+# levels they start in. Each W-L.szs is a Yaz0-compressed SARC archive with a
+# course/courseN.bin per area; only the entrance ids of each area are kept.
+# Archives are indexed in parallel, and the indexes are cached on disk by the
+# SHA-1 of the archive, so only new or changed archives are read again.
+
+################################################################
+################################################################
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import struct
+
+from exbin import Cancelled, openAtomic, readFile
+
+DefaultCachePath = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'challenge-editor', 'courses.json')
+CacheVersion = 1
+
+# Course files start with the (offset, size) of each of their 17 blocks.
+# Block 6 holds the entrances, 0x18 bytes each, with the id at 0x08.
+EntranceBlock = 6
+EntranceSize = 0x18
+EntranceIdOffset = 0x08
+
+CourseName = re.compile(r'(?:.*/)?course(\d+)\.bin$')
+
+
+def decompressYaz0(data):
+    """Returns the decompressed data of a Yaz0 file"""
+    if data[:4] != b'Yaz0':
+        raise ValueError('not Yaz0 data')
+    size = struct.unpack_from('>I', data, 4)[0]
+    out = bytearray()
+    src = 16
+    try:
+        while len(out) < size:
+            code = data[src]
+            src += 1
+            if code == 0xFF and size - len(out) >= 8:
+                # Eight literal bytes
+                out += data[src:src + 8]
+                src += 8
+                continue
+
+            for bit in range(8):
+                if len(out) >= size: break
+                if code & 0x80:
+                    out.append(data[src])
+                    src += 1
+                else:
+                    b1 = data[src]
+                    b2 = data[src + 1]
+                    src += 2
+                    distance = (((b1 & 0x0F) << 8) | b2) + 1
+                    count = b1 >> 4
+                    if count == 0:
+                        count = data[src] + 0x12
+                        src += 1
+                    else:
+                        count += 2
+
+                    start = len(out) - distance
+                    if start < 0:
+                        raise ValueError('Yaz0 back-reference before the start of the data')
+                    if distance >= count:
+                        out += out[start:start + count]
+                    else:
+                        # The copy overlaps what it writes: the last distance bytes repeat
+                        pattern = out[start:]
+                        repeats, rest = divmod(count, distance)
+                        out += pattern * repeats + pattern[:rest]
+                code <<= 1
+    except IndexError:
+        raise ValueError('Yaz0 data is cut short')
+    return bytes(out[:size])
+
+
+def readSarc(data):
+    """Returns {name: data} of the files in a SARC archive"""
+    if data[:4] != b'SARC':
+        raise ValueError('not a SARC archive')
+    order = '>' if data[6:8] == b'\xFE\xFF' else '<'
+    headerSize = struct.unpack_from(order + 'H', data, 4)[0]
+    dataOffset = struct.unpack_from(order + 'I', data, 0x0C)[0]
+
+    magic, sfatSize, count = struct.unpack_from(order + '4sHH', data, headerSize)
+    if magic != b'SFAT':
+        raise ValueError('SARC archive has no SFAT')
+    nodes = headerSize + sfatSize
+    sfnt = nodes + (count * 0x10)
+    magic, sfntSize = struct.unpack_from(order + '4sH', data, sfnt)
+    if magic != b'SFNT':
+        raise ValueError('SARC archive has no SFNT')
+    names = sfnt + sfntSize
+
+    view = memoryview(data)
+    files = {}
+    for i in range(count):
+        hash, attributes, start, end = struct.unpack_from(order + '4I', data, nodes + (i * 0x10))
+        if attributes & 0x01000000:
+            offset = names + ((attributes & 0xFFFF) * 4)
+            name = bytes(data[offset:data.index(b'\0', offset)]).decode('utf-8', 'replace')
+        else:
+            name = '0x%08X' % hash
+        files[name] = view[dataOffset + start:dataOffset + end]
+    return files
+
+
+def courseEntrances(course):
+    """Returns the entrance ids of a course file"""
+    offset, size = struct.unpack_from('>2I', course, EntranceBlock * 8)
+    if offset + size > len(course):
+        raise ValueError('entrance block is past the end of the course file')
+    return sorted(set(course[offset + (i * EntranceSize) + EntranceIdOffset] for i in range(size // EntranceSize)))
+
+
+def archiveIndex(data):
+    """Returns {area (0-based, as a string): entrance ids} of a level archive"""
+    if data[:4] == b'Yaz0':
+        data = decompressYaz0(data)
+    areas = {}
+    for name, course in readSarc(data).items():
+        match = CourseName.match(name)
+        if match:
+            areas[str(int(match.group(1)) - 1)] = courseEntrances(course)
+    return areas
+
+
+def indexArchive(fp):
+    """Returns the index of a level archive file, or {'error': message} if it can't be read"""
+    try:
+        return archiveIndex(readFile(fp))
+    except (OSError, ValueError, struct.error) as e:
+        return {'error': str(e)}
+
+
+def levelName(world, level):
+    """Returns the archive name of a level, as shown in the editor"""
+    return '%d-%d.szs' % (world + 1, level + 1)
+
+
+def loadCache(fp):
+    """Returns {SHA-1: archive index} from a cache file"""
+    try:
+        with open(fp) as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return cache.get('archives', {}) if cache.get('version') == CacheVersion else {}
+
+
+def saveCache(fp, archives):
+    """Writes a cache file"""
+    os.makedirs(os.path.dirname(fp), exist_ok=True)
+    with openAtomic(fp) as file:
+        file.write(json.dumps({'version': CacheVersion, 'archives': archives}).encode('utf-8'))
+
+
+class CourseIndex():
+    """The areas and entrances of each level of a course folder"""
+    def __init__(self, folder, archives):
+        """Initialises the index; archives is {lowercase archive name: archive index}"""
+        self.folder = folder
+        self.archives = archives
+
+    def problem(self, world, level, area, entrance):
+        """Returns what's wrong with a challenge's level, area and entrance, or None"""
+        name = levelName(world, level)
+        areas = self.archives.get(name)
+        if areas is None:
+            return '%s does not exist' % name
+        if 'error' in areas:
+            return '%s could not be read: %s' % (name, areas['error'])
+        entrances = areas.get(str(area))
+        if entrances is None:
+            return '%s has no area %d' % (name, area + 1)
+        if entrance not in entrances:
+            return 'Area %d of %s has no entrance %d' % (area + 1, name, entrance)
+        return None
+
+
+def scanCourses(folder, jobs=None, cachePath=DefaultCachePath, progress=None):
+    """Indexes the .szs archives of a course folder; archives that aren't in
+    the cache are read in worker processes. progress works as for exbin.readFile."""
+    names = sorted(name for name in os.listdir(folder) if name.lower().endswith('.szs'))
+    cache = loadCache(cachePath) if cachePath else {}
+
+    hashes = {}
+    misses = []
+    for name in names:
+        fp = os.path.join(folder, name)
+        with open(fp, 'rb') as file:
+            hashes[name] = hashlib.sha1(file.read()).hexdigest()
+        if hashes[name] not in cache:
+            misses.append(name)
+
+    done = len(names) - len(misses)
+    if progress is not None and progress(done, len(names)) is False:
+        raise Cancelled()
+    if misses:
+        archives = dict(cache)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = dict((pool.submit(indexArchive, os.path.join(folder, name)), name) for name in misses)
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                archives[hashes[name]] = future.result()
+                # Archives that can't be read are tried again next time
+                if 'error' not in archives[hashes[name]]:
+                    cache[hashes[name]] = archives[hashes[name]]
+                done += 1
+                if progress is not None and progress(done, len(names)) is False:
+                    for other in futures:
+                        other.cancel()
+                    raise Cancelled()
+        if cachePath:
+            saveCache(cachePath, cache)
+        cache = archives
+
+    return CourseIndex(folder, dict((name.lower(), cache[hashes[name]]) for name in names))
@@ -0,0 +1,810 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Challenge Editor - Edits NSMBU's challenge data file.
+# Copyright (C) 2016 Grop
+
+# exbin.py
+# The challenge data format. Only needs the standard library, so scripts can
+# use it without PyQt5.
+
+################################################################
+################################################################
+version = '1.0'
+
+import array
+import ast
+import collections
+import contextlib
+import functools
+import mmap
+import operator
+import os
+import struct
+import zlib
+
+from instrument import timed
+
+# Layout of a single entry. This table is the only place the fields are
+# spelled out: the struct codec, the Entry class, the NumPy dtype and the
+# editor's bindings are all made from it.
+#   name, offset in the entry, struct type, amount added when shown in the editor
+Field = collections.namedtuple('Field', 'name offset type shown')
+EntryFields = (
+    Field('babyyoshi',     0x00, 'I', 0),
+    Field('level',         0x04, 'I', 1),
+    Field('powerup',       0x08, 'I', 0),
+    Field('unk3',          0x0C, 'I', 0),
+    Field('unk4',          0x10, 'I', 0),
+    Field('unk5',          0x14, 'I', 0),
+    Field('catid',         0x18, 'I', 0),
+    Field('unk6',          0x1C, 'I', 0),
+    Field('world',         0x20, 'I', 1),
+    Field('unk7',          0x24, 'I', 0),
+    Field('unk8',          0x28, 'i', 0),
+    Field('prequel',       0x2C, 'i', 0), # Unknown effect
+    Field('unk9',          0x30, 'I', 0),
+    Field('unk10',         0x34, 'i', 0),
+    Field('time',          0x38, 'I', 0),
+    Field('stars',         0x3C, 'I', 0),
+    Field('area',          0x40, 'I', 1),
+    Field('entrance',      0x44, 'I', 0),
+    Field('id',            0x48, 'I', 0),
+    Field('unk15',         0x4C, 'i', 0),
+    Field('unk16',         0x50, 'i', 0),
+    Field('bronzeminimum', 0x54, 'I', 0),
+    Field('silverminimum', 0x58, 'I', 0),
+    Field('goldenminimum', 0x5C, 'I', 0),
+    )
+FieldNames = tuple(field.name for field in EntryFields)
+
+# Codec of a record of the CAFE file; see Layout for the other variants
+EntryStruct = struct.Struct('>' + ''.join(field.type for field in EntryFields))
+
+# The offsets must follow each other without gaps
+assert all(field.offset == prev.offset + struct.calcsize(prev.type) for prev, field in zip(EntryFields, EntryFields[1:]))
+
+getEntryFields = operator.attrgetter(*FieldNames)
+
+# Names of the values of catid, powerup and babyyoshi
+Categories = ("Time Attack", "Coin Collection", "1-UP Rally", "Special", "Boost Mode")
+Powerups = ("Small", "Super Mushroom", "Fire Flower", "Mini Mushroom", "Propeller Mushroom", "Penguin Suit", "Ice Flower", "Acorn Mushroom", "P-Acorn Mushroom")
+BabyYoshis = ("None", "Blue Baby Yoshi", "Pink Baby Yoshi", "Yellow Baby Yoshi*")
+
+# Field name -> (lowest, highest) value it can hold
+FieldRanges = dict((field.name, (0, 0xFFFFFFFF) if field.type == 'I' else (-0x80000000, 0x7FFFFFFF)) for field in EntryFields)
+
+def clampField(name, value):
+    """Rounds and clamps a value into the range of a field"""
+    low, high = FieldRanges[name]
+    return min(high, max(low, int(round(value))))
+
+
+# Expressions over the fields of a challenge, such as 'catid==0 and world==3'.
+# 'index' is the 0-based position of the challenge. Only the AST nodes below
+# are allowed, so an expression can't call anything.
+ExpressionNodes = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.BitAnd, ast.BitOr, ast.BitXor, ast.LShift, ast.RShift,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.Tuple, ast.List, ast.Constant, ast.Name, ast.Load,
+    )
+
+def parseExpression(text):
+    """Parses and checks an expression; raises ValueError or SyntaxError if it isn't allowed"""
+    tree = ast.parse(text, '<expression>', 'eval')
+    for node in ast.walk(tree):
+        if not isinstance(node, ExpressionNodes):
+            raise ValueError('%s is not allowed in expressions: %r' % (type(node).__name__, text))
+        if isinstance(node, ast.Name) and node.id not in FieldNames and node.id != 'index':
+            raise ValueError('Unknown field %r in expression: %r' % (node.id, text))
+    return tree
+
+def compileExpression(text):
+    """Compiles an expression for evalExpression"""
+    return compile(parseExpression(text), '<expression>', 'eval')
+
+def evalExpression(code, values):
+    """Evaluates a compiled expression over a dict of field values"""
+    return eval(code, {'__builtins__': {}}, values)
+
+def entryValues(challenge, index):
+    """Returns the fields of a challenge as a dict, for evalExpression"""
+    values = dict(zip(FieldNames, getEntryFields(challenge)))
+    values['index'] = index
+    return values
+
+
+class VectorTransformer(ast.NodeTransformer):
+    """Rewrites and/or/not and chained comparisons into &, | and == 0, so an
+    expression can be evaluated over whole NumPy columns at once"""
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd if isinstance(node.op, ast.And) else ast.BitOr
+        values = [ast.Compare(value, [ast.NotEq()], [ast.Constant(0)]) for value in node.values]
+        result = values[0]
+        for value in values[1:]:
+            result = ast.BinOp(result, op(), value)
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.Compare(node.operand, [ast.Eq()], [ast.Constant(0)])
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if len(node.ops) == 1:
+            return node
+        left = node.left
+        result = None
+        for op, right in zip(node.ops, node.comparators):
+            part = ast.Compare(left, [op], [right])
+            result = part if result is None else ast.BinOp(result, ast.BitAnd(), part)
+            left = right
+        return result
+
+def compileVectorExpression(text):
+    """Compiles an expression for evaluating over NumPy columns"""
+    tree = ast.fix_missing_locations(VectorTransformer().visit(parseExpression(text)))
+    return compile(tree, '<expression>', 'eval')
+
+
+class EntryData():
+    """The fields of an entry, without change tracking"""
+    __slots__ = FieldNames + ('dirty', 'observer')
+
+
+class Entry(EntryData):
+    """Class that represents an entry"""
+    __slots__ = ()
+
+    def __init__(self, data=None):
+        """Initialises the entry"""
+        if data is None:
+            data = (0,) * len(FieldNames)
+        self.load(data)
+
+    def load(self, data):
+        """Parses entry data"""
+        setter = object.__setattr__
+        for name, value in zip(FieldNames, data):
+            setter(self, name, value)
+        setter(self, 'dirty', None) # name -> loaded value of the changed fields, once one is
+        setter(self, 'observer', None) # called as observer(name, old, new) on changes
+
+    def __setattr__(self, name, value):
+        """Sets a field, remembering it while it differs from its loaded value"""
+        old = getattr(self, name, value)
+        object.__setattr__(self, name, value)
+        if old != value:
+            if self.dirty is None:
+                object.__setattr__(self, 'dirty', {})
+            clean = self.dirty.setdefault(name, old)
+            if clean == value:
+                # Changed back, e.g. by undo
+                del self.dirty[name]
+            if self.observer is not None:
+                self.observer(name, old, value)
+
+    def setObserver(self, observer):
+        """Sets the function called as observer(name, old, new) when a field changes"""
+        object.__setattr__(self, 'observer', observer)
+
+    def save(self, layout=None):
+        """Returns the entry, in the layout of its file (default: the CAFE one)"""
+        return bytearray((layout or BigEndian).entryStruct.pack(*getEntryFields(self)))
+
+
+def makeEntryLoader():
+    """Returns loadEntry(data), which makes an Entry from its field values.
+    Entry.__setattr__ would run for every field, so the fields are stored
+    with plain slot writes on an EntryData that then becomes the Entry."""
+    source = ('def loadEntry(data):\n'
+              '    entry = EntryData()\n'
+              '    %s = data\n'
+              '    entry.dirty = None\n'
+              '    entry.observer = None\n'
+              '    entry.__class__ = Entry\n'
+              '    return entry\n') % ', '.join('entry.' + name for name in FieldNames)
+    namespace = {'EntryData': EntryData, 'Entry': Entry}
+    exec(source, namespace)
+    return namespace['loadEntry']
+
+loadEntry = makeEntryLoader()
+
+# The file starts with a 0x10-byte header of four words. Their meaning is
+# unknown (the CAFE file has 0x0BB8, 0x03E8, 0, 0); they are kept as read.
+# None of them is a record count, so the number of records is however many
+# whole 0x60-byte records follow the header. Anything after the last record
+# is kept as trailing data.
+HeaderStruct = struct.Struct('>4I')
+HeaderSize = HeaderStruct.size
+DefaultHeader = (0x0BB8, 0x03E8, 0, 0)
+
+def recordCount(size, stride=EntryStruct.size):
+    """Returns how many records a file of this size holds"""
+    return max(0, (size - HeaderSize) // stride)
+
+
+# The Wii U (CAFE) file is big-endian; other releases and homebrew ports
+# store the same header and records little-endian. A Layout is a byte order
+# and a field table (the same fields, in the same order, but their types may
+# differ), and holds the codecs that the classes below read and write with.
+class Layout():
+    """Byte order and record layout of one variant of the file"""
+    def __init__(self, name, order, fields=EntryFields):
+        """Makes the codecs for fields in byte order ('>' or '<')"""
+        if tuple(field.name for field in fields) != FieldNames:
+            raise ValueError('a layout must have the fields %s, in that order' % ', '.join(FieldNames))
+        self.name = name
+        self.order = order
+        self.fields = fields
+        self.headerStruct = struct.Struct(order + '4I')
+        self.entryStruct = struct.Struct(order + ''.join(field.type for field in fields))
+        self.stride = self.entryStruct.size
+        self.fieldCodecs = dict((field.name, (struct.Struct(order + field.type), field.offset)) for field in fields)
+        self.recordDtype = None
+        assert all(field.offset == prev.offset + struct.calcsize(prev.type) for prev, field in zip(fields, fields[1:]))
+
+    def __repr__(self):
+        return 'Layout(%r, %r)' % (self.name, self.order)
+
+    def dtype(self):
+        """Returns the NumPy dtype of a record; NumPy must be loaded"""
+        if self.recordDtype is None:
+            formats = [self.order + ('u' if field.type.isupper() else 'i') + str(struct.calcsize(field.type)) for field in self.fields]
+            self.recordDtype = numpy.dtype({'names': FieldNames, 'formats': formats, 'offsets': [field.offset for field in self.fields], 'itemsize': self.stride})
+        return self.recordDtype
+
+    def wordsOnly(self):
+        """Returns whether every field is a 32-bit word, like the header's"""
+        return all(struct.calcsize(field.type) == 4 for field in self.fields)
+
+BigEndian = Layout('big', '>')
+LittleEndian = Layout('little', '<')
+Layouts = collections.OrderedDict((layout.name, layout) for layout in (BigEndian, LittleEndian))
+
+# How many records detectLayout looks at besides the header
+DetectRecords = 16
+
+def plausibleCount(values):
+    """Returns how many of some values are small numbers, positive or negative"""
+    return sum(1 for value in values if -0x10000 < value < 0x10000 or value >= 0xFFFF0000)
+
+def detectLayout(data, layouts=None, default=None):
+    """Returns the layout data is most likely in. Header words and fields
+    are mostly small numbers, which read as huge ones in the wrong byte
+    order, so this picks the layout that reads the most small values from
+    the header, and only if that ties, from the first records as well.
+    Ties, like all-zero data, go to default, or else to the first layout
+    (the CAFE one)."""
+    layouts = list(layouts or Layouts.values())
+    if len(data) < HeaderSize:
+        return default if default in layouts else layouts[0]
+
+    counts = collections.OrderedDict((layout, plausibleCount(layout.headerStruct.unpack_from(data, 0))) for layout in layouts)
+    best = [layout for layout, count in counts.items() if count == max(counts.values())]
+    if len(best) > 1:
+        for layout in best:
+            records = min(recordCount(len(data), layout.stride), DetectRecords)
+            for values in layout.entryStruct.iter_unpack(memoryview(data)[HeaderSize:HeaderSize + (records * layout.stride)]):
+                counts[layout] += plausibleCount(values)
+        best = [layout for layout in best if counts[layout] == max(counts[layout] for layout in best)]
+    return default if default in best else best[0]
+
+# array type code of a 32-bit word
+WordCode = 'I' if array.array('I').itemsize == 4 else 'L'
+
+def convertData(data, source, target):
+    """Returns file data in the source layout converted to the target
+    layout, byte-exact on the way back. Layouts with the same field sizes
+    only differ in byte order, so the header and records are byte-swapped
+    a word at a time in C, without unpacking any fields; other layouts are
+    converted field by field with NumPy. Trailing data is kept as it is."""
+    if source.order == target.order and source.fields == target.fields:
+        return bytes(data)
+    if len(data) < HeaderSize:
+        raise ValueError('file is shorter than its header')
+    count = recordCount(len(data), source.stride)
+    end = HeaderSize + (count * source.stride)
+
+    if source.fields == target.fields and source.wordsOnly():
+        words = array.array(WordCode)
+        words.frombytes(memoryview(data)[:end])
+        words.byteswap()
+        return words.tobytes() + bytes(data[end:])
+
+    if not loadNumpy():
+        raise ValueError('converting from the %s to the %s layout needs NumPy' % (source.name, target.name))
+    records = numpy.frombuffer(data, source.dtype(), count, HeaderSize).astype(target.dtype())
+    return target.headerStruct.pack(*source.headerStruct.unpack_from(data, 0)) + records.tobytes() + bytes(data[end:])
+
+
+def iterEntries(fileobj, count=None, layout=None):
+    """Yields the entries of a file object one at a time, after reading its header.
+    Stops after count entries, or at the end of the file if count is None;
+    pass count to read one file out of several concatenated ones. The layout
+    is detected from the header unless given."""
+    header = fileobj.read(HeaderSize)
+    if len(header) < HeaderSize:
+        return
+    if layout is None:
+        layout = detectLayout(header)
+
+    i = 0
+    while count is None or i < count:
+        data = fileobj.read(layout.stride)
+        if len(data) < layout.stride:
+            return
+        yield loadEntry(layout.entryStruct.unpack(data))
+        i += 1
+
+
+class File():
+    """Class that represents a challenge file"""
+    def __init__(self, rawdata=None, layout=None):
+        """Initialises the exbin file, in the layout detected from rawdata
+        unless one is given; empty files are in the CAFE layout"""
+        self.observers = []
+        if layout is None:
+            layout = BigEndian if rawdata is None else detectLayout(rawdata)
+        self.layout = layout
+        if rawdata == None:
+            self.initAsEmpty()
+        else:
+            self.initFromData(rawdata)
+
+    def initAsEmpty(self):
+        """Empties the challenges"""
+        self.header = list(DefaultHeader)
+        self.trailer = b''
+        self.challenges = []
+        self.savedHeader = list(self.header)
+
+    @timed('File.initFromData')
+    def initFromData(self, rawdata):
+        """Initialises the file from data"""
+        layout = self.layout
+        self.header = list(layout.headerStruct.unpack_from(rawdata, 0))
+        count = recordCount(len(rawdata), layout.stride)
+        self.trailer = bytes(rawdata[HeaderSize + (count * layout.stride):])
+
+        self.challenges = [loadEntry(data) for data in layout.entryStruct.iter_unpack(memoryview(rawdata)[HeaderSize:HeaderSize + (count * layout.stride)])]
+        if self.observers:
+            self.watchChallenges(True)
+        self.savedHeader = list(self.header) # new entries are clean already
+
+    def saveHeader(self):
+        """Returns the header"""
+        return bytearray(self.layout.headerStruct.pack(*self.header))
+
+    def save(self):
+        """Saves the Challenge data edits"""
+        pack = self.layout.entryStruct.pack
+        data = self.saveHeader()
+        for challenge in self.challenges:
+            data += pack(*getEntryFields(challenge))
+        data += self.trailer
+        return data
+
+    def dirtyIndices(self):
+        """Returns the indices of the challenges changed since load"""
+        return [i for i, challenge in enumerate(self.challenges) if challenge.dirty]
+
+    def markClean(self):
+        """Forgets about all changes, e.g. after they were saved"""
+        for challenge in self.challenges:
+            if challenge.dirty:
+                challenge.dirty.clear()
+        self.savedHeader = list(self.header)
+
+    def markFieldClean(self, index, name):
+        """Forgets about a change to one field, e.g. when the file on disk has the same value"""
+        dirty = self.challenges[index].dirty
+        if dirty:
+            dirty.pop(name, None)
+
+    def addObserver(self, observer):
+        """Calls observer(index, name, old, new) whenever a field of a challenge changes"""
+        if not self.observers:
+            self.watchChallenges(True)
+        self.observers.append(observer)
+
+    def removeObserver(self, observer):
+        """Stops calling an observer"""
+        self.observers.remove(observer)
+        if not self.observers:
+            self.watchChallenges(False)
+
+    def watchChallenges(self, watch):
+        """Starts or stops passing changes to challenges on to fieldChanged"""
+        for i, challenge in enumerate(self.challenges):
+            challenge.setObserver(functools.partial(self.fieldChanged, i) if watch else None)
+
+    def fieldChanged(self, index, name, old, new):
+        """Tells the observers about a change to a challenge"""
+        for observer in self.observers:
+            observer(index, name, old, new)
+
+    def select(self, where):
+        """Returns the indices of the challenges an expression is true for"""
+        code = compileExpression(where)
+        return [i for i, challenge in enumerate(self.challenges) if evalExpression(code, entryValues(challenge, i))]
+
+    def getColumn(self, name, rows):
+        """Returns a field of the challenges at the given indices"""
+        challenges = self.challenges
+        return [getattr(challenges[i], name) for i in rows]
+
+    def setColumn(self, name, values, rows):
+        """Sets a field of the challenges at the given indices, to one value or one per index"""
+        challenges = self.challenges
+        if isinstance(values, int):
+            values = [values] * len(rows)
+        for i, value in zip(rows, values):
+            setattr(challenges[i], name, value)
+
+    def scaleColumns(self, names, factor, rows):
+        """Multiplies fields of the challenges at the given indices, rounding and clamping the results"""
+        for name in names:
+            self.setColumn(name, [clampField(name, value * factor) for value in self.getColumn(name, rows)], rows)
+
+    def incrementalChanges(self):
+        """Returns the (offset, data) writes that bring the file this was loaded from up to date"""
+        layout = self.layout
+        changes = [(HeaderSize + (i * layout.stride), layout.entryStruct.pack(*getEntryFields(self.challenges[i]))) for i in self.dirtyIndices()]
+        if self.header != self.savedHeader:
+            changes.insert(0, (0, self.saveHeader()))
+        return changes
+
+    def saveIncremental(self, fp):
+        """Writes only the changed challenges back to fp, which must hold the file this was loaded from"""
+        changes = self.incrementalChanges()
+        writeChanges(fp, changes)
+        self.markClean()
+        return len(changes)
+
+
+# Crash-safe partial writes: the changes are first written and synced to
+# <file>.journal, then applied in place, and only then is the journal removed.
+# A complete journal left behind by a crash is replayed by replayJournal.
+JournalMagic = b'EXJ1'
+
+def writeJournal(fp, changes):
+    """Writes a journal of (offset, data) changes for fp"""
+    body = bytearray(struct.pack('>I', len(changes)))
+    for offset, data in changes:
+        body += struct.pack('>2I', offset, len(data))
+        body += data
+
+    tmp = fp + '.journal.tmp'
+    with open(tmp, 'wb') as file:
+        file.write(JournalMagic + body + struct.pack('>I', zlib.crc32(body) & 0xFFFFFFFF))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp, fp + '.journal')
+
+def replayJournal(fp):
+    """Applies and removes a pending journal for fp; returns whether there was one"""
+    jp = fp + '.journal'
+    if not os.path.exists(jp):
+        return False
+    with open(jp, 'rb') as file:
+        journal = file.read()
+
+    body = journal[4:-4]
+    if journal[:4] != JournalMagic or struct.unpack('>I', journal[-4:])[0] != zlib.crc32(body) & 0xFFFFFFFF:
+        # Incomplete journal: the file itself was never touched
+        os.remove(jp)
+        return False
+
+    with open(fp, 'r+b') as file:
+        count = struct.unpack_from('>I', body, 0)[0]
+        pos = 4
+        for i in range(count):
+            offset, length = struct.unpack_from('>2I', body, pos)
+            pos += 8
+            file.seek(offset)
+            file.write(body[pos:pos + length])
+            pos += length
+        file.flush()
+        os.fsync(file.fileno())
+    os.remove(jp)
+    return True
+
+def writeChanges(fp, changes, progress=None):
+    """Writes (offset, data) changes to fp through the journal. progress is
+    checked once before anything is written; see readFile."""
+    if progress is not None and progress(0, len(changes)) is False:
+        raise Cancelled()
+    if changes:
+        writeJournal(fp, changes)
+        replayJournal(fp)
+    if progress is not None:
+        progress(len(changes), len(changes))
+
+
+# Whole files are read and written in chunks, so that slow disks can show
+# progress and be cancelled between them
+ChunkSize = 0x10000
+
+class Cancelled(Exception):
+    """Raised when a progress callback cancels a read or write"""
+    pass
+
+def readFile(fp, progress=None):
+    """Returns the data of a file. progress(done, total) is called after each
+    chunk, and can return False to cancel, which raises Cancelled."""
+    with open(fp, 'rb') as file:
+        total = os.fstat(file.fileno()).st_size
+        data = bytearray()
+        while True:
+            chunk = file.read(ChunkSize)
+            if not chunk: break
+            data += chunk
+            if progress is not None and progress(len(data), total) is False:
+                raise Cancelled()
+    return bytes(data)
+
+@contextlib.contextmanager
+def openAtomic(fp):
+    """Opens a temporary file to write fp through. It is renamed over fp when
+    the block finishes, or removed if it raises, so fp is never left half-written."""
+    tmp = fp + '.tmp'
+    try:
+        with open(tmp, 'wb') as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, fp)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def writeAtomic(fp, data, progress=None):
+    """Writes the data of a file through openAtomic. progress works as for readFile."""
+    with openAtomic(fp) as file:
+        for start in range(0, len(data), ChunkSize):
+            file.write(data[start:start + ChunkSize])
+            if progress is not None and progress(min(start + ChunkSize, len(data)), len(data)) is False:
+                raise Cancelled()
+
+
+# NumPy is only imported when a NumpyFile is made, it takes longer to import
+# than everything else here
+numpy = None
+
+def loadNumpy():
+    """Imports NumPy on first use; returns whether it is available"""
+    global numpy
+    if numpy is None:
+        try:
+            import numpy as np
+        except ImportError:
+            return False
+        numpy = np
+    return True
+
+
+class EntryList():
+    """Sequence of entry views, created when they are asked for"""
+    def __init__(self, count, factory):
+        """Initialises the list"""
+        self.count = count
+        self.factory = factory
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.factory(i) for i in range(*index.indices(self.count))]
+        if index < 0: index += self.count
+        if not 0 <= index < self.count: raise IndexError(index)
+        return self.factory(index)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.factory(i)
+
+
+class NumpyEntry():
+    """Entry that is a view onto one row of a NumpyFile"""
+    __slots__ = ('row', 'file', 'index')
+
+    def __init__(self, file, index):
+        """Initialises the entry"""
+        object.__setattr__(self, 'row', file.records[index])
+        object.__setattr__(self, 'file', file)
+        object.__setattr__(self, 'index', index)
+
+    def __getattr__(self, name):
+        """Reads a field from the row"""
+        try:
+            return int(self.row[name])
+        except (KeyError, ValueError):
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        """Writes a field to the row"""
+        old = int(self.row[name])
+        self.row[name] = value
+        if self.file.observers and old != value:
+            self.file.fieldChanged(self.index, name, old, value)
+
+    def save(self):
+        """Returns the entry"""
+        return bytearray(self.row.tobytes())
+
+
+class NumpyFile(File):
+    """Challenge file that keeps all entries in one NumPy structured array"""
+    def __init__(self, rawdata=None, layout=None):
+        """Initialises the exbin file"""
+        if not loadNumpy():
+            raise ImportError('NumpyFile needs NumPy to be installed')
+        File.__init__(self, rawdata, layout)
+
+    def initAsEmpty(self):
+        """Empties the challenges"""
+        self.header = list(DefaultHeader)
+        self.trailer = b''
+        self.records = numpy.zeros(0, dtype=self.layout.dtype())
+        self.challenges = EntryList(len(self.records), lambda i: NumpyEntry(self, i))
+        self.markClean()
+
+    @timed('NumpyFile.initFromData')
+    def initFromData(self, rawdata):
+        """Initialises the file from data"""
+        layout = self.layout
+        self.header = list(layout.headerStruct.unpack_from(rawdata, 0))
+        count = recordCount(len(rawdata), layout.stride)
+        self.trailer = bytes(rawdata[HeaderSize + (count * layout.stride):])
+        self.records = numpy.frombuffer(rawdata, dtype=layout.dtype(), count=count, offset=HeaderSize).copy()
+        self.challenges = EntryList(len(self.records), lambda i: NumpyEntry(self, i))
+        self.markClean()
+
+    def save(self):
+        """Saves the Challenge data edits"""
+        data = self.saveHeader()
+        data += self.records.tobytes()
+        data += self.trailer
+        return data
+
+    def dirtyIndices(self):
+        """Returns the indices of the challenges changed since load"""
+        return numpy.nonzero(self.records != self.original)[0].tolist()
+
+    def markClean(self):
+        """Forgets about all changes, e.g. after they were saved"""
+        self.original = self.records.copy()
+        self.savedHeader = list(self.header)
+
+    def markFieldClean(self, index, name):
+        """Forgets about a change to one field, e.g. when the file on disk has the same value"""
+        self.original[name][index] = self.records[name][index]
+
+    def select(self, where):
+        """Returns the indices of the challenges an expression is true for"""
+        values = dict((name, self.records[name].astype(numpy.int64)) for name in FieldNames)
+        values['index'] = numpy.arange(len(self.records))
+        try:
+            result = evalExpression(compileVectorExpression(where), values)
+        except (TypeError, ValueError):
+            # e.g. 'in', which doesn't work on whole columns
+            return File.select(self, where)
+        return numpy.nonzero(numpy.broadcast_to(result, len(self.records)))[0].tolist()
+
+    def getColumn(self, name, rows):
+        """Returns a field of the challenges at the given indices"""
+        return self.records[name][rows].tolist()
+
+    def setColumn(self, name, values, rows):
+        """Sets a field of the challenges at the given indices, to one value or one per index"""
+        old = self.records[name][rows] if self.observers else None
+        self.records[name][rows] = values
+        self.columnChanged(name, rows, old)
+
+    def scaleColumns(self, names, factor, rows):
+        """Multiplies fields of the challenges at the given indices, rounding and clamping the results"""
+        for name in names:
+            low, high = FieldRanges[name]
+            old = self.records[name][rows]
+            self.records[name][rows] = numpy.clip(numpy.rint(old * float(factor)), low, high)
+            self.columnChanged(name, rows, old if self.observers else None)
+
+    def columnChanged(self, name, rows, old):
+        """Tells the observers about the values of a column that changed in a bulk edit"""
+        if old is None: return
+        rows = numpy.asarray(rows, dtype=numpy.intp)
+        new = self.records[name][rows]
+        for i in numpy.nonzero(old != new)[0]:
+            self.fieldChanged(int(rows[i]), name, int(old[i]), int(new[i]))
+
+    def watchChallenges(self, watch):
+        """The entries are views that check file.observers themselves"""
+        pass
+
+
+class MappedEntry():
+    """Entry whose fields are read from and written to a mapped buffer"""
+    __slots__ = ('file', 'index', 'buffer', 'offset')
+
+    def __init__(self, file, index):
+        """Initialises the entry"""
+        object.__setattr__(self, 'file', file)
+        object.__setattr__(self, 'index', index)
+        object.__setattr__(self, 'buffer', file.map)
+        object.__setattr__(self, 'offset', HeaderSize + (index * file.layout.stride))
+
+    def __getattr__(self, name):
+        """Reads a field straight from the buffer"""
+        try:
+            codec, offset = self.file.layout.fieldCodecs[name]
+        except KeyError:
+            raise AttributeError(name)
+        return codec.unpack_from(self.buffer, self.offset + offset)[0]
+
+    def __setattr__(self, name, value):
+        """Writes a field straight to the buffer"""
+        codec, offset = self.file.layout.fieldCodecs[name]
+        old = codec.unpack_from(self.buffer, self.offset + offset)[0]
+        codec.pack_into(self.buffer, self.offset + offset, value)
+        if self.file.observers and old != value:
+            self.file.fieldChanged(self.index, name, old, value)
+
+    def save(self):
+        """Returns the entry"""
+        return bytearray(self.buffer[self.offset:self.offset + self.file.layout.stride])
+
+
+class MappedFile(File):
+    """Challenge file that is edited in place through an mmap"""
+    def __init__(self, fp, readonly=False, layout=None):
+        """Maps the exbin file at fp, in the layout detected from it unless one is given"""
+        self.fp = fp
+        self.observers = []
+        with open(fp, 'rb' if readonly else 'r+b') as file:
+            # mmap can't map an empty file, and there has to be a header to read
+            if os.fstat(file.fileno()).st_size < HeaderSize:
+                raise ValueError('%s is shorter than the header of a challenge file' % fp)
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE)
+
+        self.layout = layout or detectLayout(self.map)
+        self.header = list(self.layout.headerStruct.unpack_from(self.map, 0))
+        count = recordCount(len(self.map), self.layout.stride)
+        self.challenges = EntryList(count, lambda i: MappedEntry(self, i))
+
+    def save(self):
+        """Returns the mapped data"""
+        return bytearray(self.map)
+
+    def flush(self):
+        """Flushes edits to the file on disk"""
+        self.map.flush()
+
+    def dirtyIndices(self):
+        """Mapped edits are never pending"""
+        return []
+
+    def markClean(self):
+        """Mapped edits are never pending"""
+        pass
+
+    def saveIncremental(self, fp):
+        """Flushes the mapped edits"""
+        self.flush()
+        return 0
+
+    def watchChallenges(self, watch):
+        """The entries are views that check file.observers themselves"""
+        pass
+
+    def close(self):
+        """Unmaps the file"""
+        self.challenges = EntryList(0, None)
+        self.map.close()
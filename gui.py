@@ -0,0 +1,1557 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Challenge Editor - Edits NSMBU's challenge data file.
+# Copyright (C) 2016 Grop
+
+# gui.py
+# The editor window
+
+################################################################
+################################################################
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+import functools
+import os
+
+from exbin import version, BabyYoshis, Categories, Cancelled, EntryFields, FieldRanges, File, MappedFile, Powerups, readFile, replayJournal, writeAtomic, writeChanges
+import instrument
+from instrument import timed
+from courses import scanCourses
+from history import Autosave, History, dataChecksum, readAutosave
+import merge
+from query import ChallengeIndex, prequelReport
+from validate import Validator, formatProblem
+
+# Images are loaded from next to this file, whatever the working directory,
+# and each one is only loaded once
+Here = os.path.dirname(os.path.abspath(__file__))
+Pixmaps = {}
+Icons = {}
+
+def getPixmap(name):
+    """Returns the (shared) pixmap of images/<name>.png"""
+    pixmap = Pixmaps.get(name)
+    if pixmap is None:
+        pixmap = Pixmaps[name] = QtGui.QPixmap(os.path.join(Here, 'images', name + '.png'))
+    return pixmap
+
+def getIcon(name):
+    """Returns the (shared) icon of images/<name>.png"""
+    icon = Icons.get(name)
+    if icon is None:
+        icon = Icons[name] = QtGui.QIcon(getPixmap(name))
+    return icon
+
+def shownStars(stars):
+    """Returns how many stars to show for a stars value; out of range ones are shown as 1 or 5"""
+    return min(max(stars, 1), 5)
+
+
+class ChallengeListModel(QtCore.QAbstractListModel):
+    """Model that lists the challenges of a file"""
+    def __init__(self):
+        """Initialises the model"""
+        QtCore.QAbstractListModel.__init__(self)
+        self.file = File()
+
+    def setFile(self, file):
+        """Changes the file to list"""
+        self.beginResetModel()
+        self.file = file
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        """Returns the number of challenges"""
+        if parent.isValid(): return 0
+        return len(self.file.challenges)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        """Returns the label of a challenge"""
+        if role != QtCore.Qt.DisplayRole or not index.isValid(): return None
+
+        challenge = self.file.challenges[index.row()]
+        if challenge.catid < len(Categories):
+            category = Categories[challenge.catid]
+        else:
+            category = 'Category %d' % challenge.catid
+        return '%d: W%d-%d %s %s' % (index.row() + 1, challenge.world + 1, challenge.level + 1, category, '\u2605' * shownStars(challenge.stars))
+
+    def updateRow(self, row):
+        """Refreshes the label of a challenge after it was edited"""
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+
+
+class ChallengeTableModel(QtCore.QAbstractTableModel):
+    """Model that shows every field of every challenge"""
+    edited = QtCore.pyqtSignal()
+
+    def __init__(self):
+        """Initialises the model"""
+        QtCore.QAbstractTableModel.__init__(self)
+        self.file = File()
+
+    def setFile(self, file):
+        """Changes the file to show"""
+        self.beginResetModel()
+        self.file = file
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        """Returns the number of challenges"""
+        if parent.isValid(): return 0
+        return len(self.file.challenges)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        """Returns the number of fields"""
+        if parent.isValid(): return 0
+        return len(EntryFields)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        """Returns a field, as shown in the editor"""
+        if role not in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole) or not index.isValid(): return None
+        field = EntryFields[index.column()]
+        return getattr(self.file.challenges[index.row()], field.name) + field.shown
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        """Sets a field from its value as shown in the editor"""
+        if role != QtCore.Qt.EditRole or not index.isValid(): return False
+        field = EntryFields[index.column()]
+        try:
+            value = int(value) - field.shown
+        except ValueError:
+            return False
+        low, high = FieldRanges[field.name]
+        if not low <= value <= high: return False
+
+        setattr(self.file.challenges[index.row()], field.name, value)
+        self.dataChanged.emit(index, index)
+        self.edited.emit()
+        return True
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        """Returns the field names and challenge numbers"""
+        if role != QtCore.Qt.DisplayRole: return None
+        if orientation == QtCore.Qt.Horizontal:
+            return EntryFields[section].name
+        return section + 1
+
+    def flags(self, index):
+        """Fields can be edited"""
+        return QtCore.QAbstractTableModel.flags(self, index) | QtCore.Qt.ItemIsEditable
+
+    def scale(self, cells, factor):
+        """Multiplies the given (row, column) cells by a factor, one bulk edit per field"""
+        for column, rows in self.groupCells(cells):
+            self.file.scaleColumns([EntryFields[column].name], factor, rows)
+        self.cellsChanged(cells)
+
+    def fillDown(self, cells):
+        """Copies the first of the given (row, column) cells of each field to the others"""
+        for column, rows in self.groupCells(cells):
+            name = EntryFields[column].name
+            self.file.setColumn(name, self.file.getColumn(name, rows[:1])[0], rows[1:])
+        self.cellsChanged(cells)
+
+    def groupCells(self, cells):
+        """Returns (column, rows) for each column of the given cells, keeping their order"""
+        columns = {}
+        for row, column in cells:
+            columns.setdefault(column, []).append(row)
+        return columns.items()
+
+    def cellsChanged(self, cells):
+        """Tells the views about a bulk edit with one signal"""
+        if not cells: return
+        rows = [row for row, column in cells]
+        columns = [column for row, column in cells]
+        self.dataChanged.emit(self.index(min(rows), min(columns)), self.index(max(rows), max(columns)))
+        self.edited.emit()
+
+    def refresh(self):
+        """Tells the views that any field may have changed"""
+        if self.rowCount() == 0: return
+        self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, self.columnCount() - 1))
+
+
+class ChallengeTable(QtWidgets.QWidget):
+    """Window that shows all challenges as a table, for editing many at once"""
+    def __init__(self):
+        """Initialises the widget"""
+        QtWidgets.QWidget.__init__(self)
+        self.model = ChallengeTableModel()
+
+        self.proxy = QtCore.QSortFilterProxyModel()
+        self.proxy.setSourceModel(self.model)
+
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.proxy)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(-1, QtCore.Qt.AscendingOrder)
+        self.table.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+
+        # Bulk operations
+        selectwhere = QtWidgets.QPushButton("Select where...")
+        selectwhere.clicked.connect(self.HandleSelectWhere)
+        scale = QtWidgets.QPushButton("Scale...")
+        scale.clicked.connect(self.HandleScale)
+        filldown = QtWidgets.QPushButton("Fill down")
+        filldown.clicked.connect(self.HandleFillDown)
+
+        buttons = QtWidgets.QHBoxLayout()
+        buttons.addWidget(selectwhere)
+        buttons.addWidget(scale)
+        buttons.addWidget(filldown)
+        buttons.addStretch(1)
+
+        L = QtWidgets.QVBoxLayout()
+        L.addLayout(buttons)
+        L.addWidget(self.table)
+        self.setLayout(L)
+
+        self.setWindowTitle('Challenge Editor - Table')
+        self.resize(900, 600)
+
+    def setFile(self, file):
+        """Changes the file to show"""
+        self.model.setFile(file)
+
+    def selectedCells(self):
+        """Returns the selected (row, column) cells, in the order they are shown"""
+        indexes = sorted(self.table.selectionModel().selectedIndexes(), key=lambda index: (index.column(), index.row()))
+        cells = []
+        for index in indexes:
+            index = self.proxy.mapToSource(index)
+            cells.append((index.row(), index.column()))
+        return cells
+
+    def HandleSelectWhere(self):
+        """Selects the challenges an expression is true for, in the selected columns (or all of them)"""
+        where, ok = QtWidgets.QInputDialog.getText(self, 'Select where', "Expression, e.g. 'catid==0 and world==3':")
+        if not ok or where == '': return
+        try:
+            rows = self.model.file.select(where)
+        except (ValueError, SyntaxError, TypeError, NameError, ZeroDivisionError) as e:
+            QtWidgets.QMessageBox.warning(self, 'Select where', str(e))
+            return
+
+        columns = sorted(set(column for row, column in self.selectedCells())) or range(self.model.columnCount())
+        selection = QtCore.QItemSelection()
+        for row in rows:
+            for column in columns:
+                index = self.proxy.mapFromSource(self.model.index(row, column))
+                selection.select(index, index)
+        self.table.selectionModel().select(selection, QtCore.QItemSelectionModel.ClearAndSelect)
+
+    def HandleScale(self):
+        """Multiplies the selected cells by a factor"""
+        cells = self.selectedCells()
+        if not cells: return
+        factor, ok = QtWidgets.QInputDialog.getDouble(self, 'Scale', 'Multiply the selected cells by:', 1.0, -1000000.0, 1000000.0, 4)
+        if not ok: return
+        self.model.scale(cells, factor)
+
+    def HandleFillDown(self):
+        """Copies the top selected cell of each column to the other selected cells"""
+        self.model.fillDown(self.selectedCells())
+
+
+class ChallengeViewer(QtWidgets.QWidget):
+    """Widget that views challenge info"""
+    edited = QtCore.pyqtSignal()
+    problemsChanged = QtCore.pyqtSignal()
+
+    def __init__(self):
+        """Initialises the widget"""
+        QtWidgets.QWidget.__init__(self)
+        self.file = File()
+        self.shownStars = 0
+
+        # Create the list of challenges
+        Challenges = QtWidgets.QGroupBox('Challenges')
+        self.model = ChallengeListModel()
+        self.ChallengeList = QtWidgets.QListView()
+        self.ChallengeList.setUniformItemSizes(True)
+        self.ChallengeList.setModel(self.model)
+        self.ChallengeList.selectionModel().currentRowChanged.connect(self.HandleDifferentChallenge)
+
+        # Only show the challenges matching an expression
+        self.index = None
+        self.filter = QtWidgets.QLineEdit()
+        self.filter.setPlaceholderText('Find, e.g. catid==0 and world==4')
+        self.filter.textChanged.connect(self.HandleFilter)
+
+        # Create the edit for the selected challenge
+        Challenge = QtWidgets.QGroupBox('Selected Challenge')
+        
+        # ID / Stars / Time
+        self.id = QtWidgets.QLineEdit()
+        self.id.setFixedWidth(40)
+        self.id.setMaxLength(5)
+
+        self.starsplus = QtWidgets.QPushButton("+")
+        self.starsplus.clicked.connect(self.addStar)
+        self.starsplus.setEnabled(False)
+        self.starsplus.setFixedWidth(25)
+
+        # A fixed set of star labels, shown or hidden as the count changes
+        self.stars = QtWidgets.QHBoxLayout()
+        self.starLabels = []
+        for i in range(5):
+            star = QtWidgets.QLabel()
+            star.setPixmap(getPixmap("star"))
+            star.hide()
+            self.stars.addWidget(star)
+            self.starLabels.append(star)
+        
+        self.starsmin = QtWidgets.QPushButton("-")
+        self.starsmin.clicked.connect(self.removeStar)
+        self.starsmin.setEnabled(False)
+        self.starsmin.setFixedWidth(25)
+
+        self.time = QtWidgets.QSpinBox()
+        self.time.setMaximum(999)
+
+        timeicon = QtWidgets.QLabel()
+        timeicon.setPixmap(getPixmap("clock"))
+        
+        starL = QtWidgets.QHBoxLayout()
+        starL.addWidget(QtWidgets.QLabel("Challenge #"))
+        starL.addWidget(self.id)
+        starL.addWidget(self.starsmin)
+        starL.addStretch(1)
+        starL.addLayout(self.stars)
+        starL.addStretch(1)
+        starL.addWidget(self.starsplus)
+        starL.addWidget(timeicon)
+        starL.addWidget(self.time)
+
+        # Category
+        category = QtWidgets.QGroupBox("Category")
+        l = QtWidgets.QHBoxLayout()
+        self.Category = QtWidgets.QComboBox()
+        self.Category.addItems(Categories)
+        self.Category.setEnabled(False)
+        l.addWidget(self.Category)
+        category.setLayout(l)
+
+        # Level ID it's using
+        self.WorldNum = QtWidgets.QLineEdit()
+        self.WorldNum.setFixedWidth(20)
+        self.WorldNum.setMaxLength(2)
+        self.LevelNum = QtWidgets.QLineEdit()
+        self.LevelNum.setFixedWidth(20)
+        self.LevelNum.setMaxLength(2)
+        minus = QtWidgets.QLabel("-")
+        minus.setFixedWidth(5)
+
+        # Level, Area and entrance
+        location = QtWidgets.QGroupBox("Location of challenge")
+        areanentrance = QtWidgets.QVBoxLayout()
+
+        levelL = QtWidgets.QHBoxLayout()
+        levelL.addWidget(QtWidgets.QLabel("Level"))
+        levelL.addStretch(1)
+        levelL.addWidget(self.WorldNum)
+        levelL.addWidget(minus)
+        levelL.addWidget(self.LevelNum)
+        levelL.addWidget(QtWidgets.QLabel(".szs"))
+
+        areanentrance.addLayout(levelL)
+
+        self.area = QtWidgets.QLineEdit()
+        self.area.setFixedWidth(20)
+        areaL = QtWidgets.QHBoxLayout()
+        areaL.addWidget(QtWidgets.QLabel("Area:"))
+        areaL.addWidget(self.area)
+
+        areanentrance.addLayout(areaL)
+        
+        self.entrance = QtWidgets.QLineEdit()
+        self.entrance.setFixedWidth(20)
+        entranceL = QtWidgets.QHBoxLayout()
+        entranceL.addWidget(QtWidgets.QLabel("Entrance:"))
+        entranceL.addWidget(self.entrance)
+
+        areanentrance.addLayout(entranceL)
+
+        location.setLayout(areanentrance)
+
+        # Unknowns, in two columns
+        UNKS = QtWidgets.QGroupBox("Unknown Values")
+        unknowns = [field for field in EntryFields if field.name.startswith('unk')]
+
+        UNKL = QtWidgets.QHBoxLayout()
+        for column in (unknowns[:5], unknowns[5:]):
+            CL = QtWidgets.QVBoxLayout()
+            for field in column:
+                edit = QtWidgets.QLineEdit()
+                edit.setFixedWidth(30)
+                setattr(self, field.name, edit)
+
+                unkL = QtWidgets.QHBoxLayout()
+                unkL.addWidget(QtWidgets.QLabel("Unknown %s (0x%02X):" % (field.name[3:], field.offset)))
+                unkL.addWidget(edit)
+                CL.addLayout(unkL)
+            UNKL.addLayout(CL)
+
+        UNKS.setLayout(UNKL)
+
+        # Medal times
+        TGB = QtWidgets.QGroupBox("Medals") # Don't even know what TGB stands for myself...
+
+        L = QtWidgets.QVBoxLayout()
+        GL = QtWidgets.QHBoxLayout()
+        self.goldenminimum = QtWidgets.QLineEdit()
+        self.goldenminimum.setFixedWidth(100)
+        goldmedal = QtWidgets.QLabel()
+        goldmedal.setPixmap(getPixmap("time_gold"))
+        GL.addWidget(goldmedal)
+        GL.addStretch(1)
+        GL.addWidget(self.goldenminimum)
+        L.addLayout(GL)
+
+        SL = QtWidgets.QHBoxLayout()
+        self.silverminimum = QtWidgets.QLineEdit()
+        self.silverminimum.setFixedWidth(100)
+        silvermedal = QtWidgets.QLabel()
+        silvermedal.setPixmap(getPixmap("time_silver"))
+        SL.addWidget(silvermedal)
+        SL.addStretch(1)
+        SL.addWidget(self.silverminimum)
+        L.addLayout(SL)
+
+        BL = QtWidgets.QHBoxLayout()
+        self.bronzeminimum = QtWidgets.QLineEdit()
+        self.bronzeminimum.setFixedWidth(100)
+        bronzemedal = QtWidgets.QLabel()
+        bronzemedal.setPixmap(getPixmap("time_bronze"))
+        BL.addWidget(bronzemedal)
+        BL.addStretch(1)
+        BL.addWidget(self.bronzeminimum)
+        L.addLayout(BL)
+
+        TGB.setLayout(L)
+
+        # Challenge values
+        CGB = QtWidgets.QGroupBox("Challenge settings")
+        q = QtWidgets.QVBoxLayout()
+
+        # Powerup
+        self.powerup = QtWidgets.QComboBox()
+        self.powerup.addItems(Powerups)
+        self.powerup.setEnabled(False)
+
+        powerupL = QtWidgets.QHBoxLayout()
+        powerupL.addWidget(QtWidgets.QLabel("Start powerup:"))
+        powerupL.addStretch(1)
+        powerupL.addWidget(self.powerup)
+        q.addLayout(powerupL)
+
+        # Baby Yoshi
+        self.babyyoshi = QtWidgets.QComboBox()
+        self.babyyoshi.addItems(BabyYoshis)
+        self.babyyoshi.setEnabled(False)
+
+        babyyoshiL = QtWidgets.QHBoxLayout()
+        babyyoshiL.addWidget(QtWidgets.QLabel("Baby Yoshi:"))
+        babyyoshiL.addStretch(1)
+        babyyoshiL.addWidget(self.babyyoshi)
+        q.addLayout(babyyoshiL)
+
+        # Prequel ID
+        self.prequel = QtWidgets.QLineEdit()
+        self.prequel.setFixedWidth(40)
+        self.prequel.setMaxLength(5)
+
+        IDL = QtWidgets.QHBoxLayout()
+        IDL.addWidget(QtWidgets.QLabel("Prequel ID:"))
+        IDL.addWidget(self.prequel)
+        q.addLayout(IDL)
+
+        CGB.setLayout(q)
+
+        BTMH = QtWidgets.QHBoxLayout()
+        BTMH.addWidget(CGB)
+        BTMH.addWidget(TGB)
+
+        # Field -> widget bindings, made from the field table. Stars are special.
+        widgetNames = {'catid': 'Category', 'world': 'WorldNum', 'level': 'LevelNum'}
+        self.bindings = [(field, getattr(self, widgetNames.get(field.name, field.name))) for field in EntryFields if field.name != 'stars']
+        self.shownStates = {} # field name -> what its widget was set to show
+
+        # Mark typed values that can't be saved as they are typed
+        for field, widget in self.bindings:
+            if isinstance(widget, QtWidgets.QLineEdit):
+                widget.textEdited.connect(functools.partial(self.HandleFieldEdited, field, widget))
+
+        # The problems found by the validator are passed on once per event loop pass
+        self.validator = None
+        self.courses = None # index of the course folder challenges are checked against
+        self.validatedTimer = QtCore.QTimer()
+        self.validatedTimer.setSingleShot(True)
+        self.validatedTimer.timeout.connect(self.problemsChanged.emit)
+
+        # Save button
+        self.save = QtWidgets.QPushButton("Save this challenge")
+        self.save.clicked.connect(self.saveFields)
+        self.save.setEnabled(False)
+
+        # Make a layout
+        L = QtWidgets.QVBoxLayout()
+        L.addWidget(self.filter)
+        L.addWidget(self.ChallengeList)
+        Challenges.setLayout(L)
+
+        L = QtWidgets.QVBoxLayout()
+        L.addLayout(starL)
+        L.addWidget(category)
+        L.addWidget(location)
+        L.addWidget(UNKS)
+        L.addLayout(BTMH)
+        L.addWidget(self.save)
+        Challenge.setLayout(L)
+
+        # Make a main layout
+        HL = QtWidgets.QHBoxLayout()
+        HL.addWidget(Challenges)
+        HL.addWidget(Challenge)
+        L = QtWidgets.QVBoxLayout()
+        L.addLayout(HL)
+
+        self.setLayout(L)
+
+    @timed('ChallengeViewer.setFile')
+    def setFile(self, file):
+        """Changes the file to view"""
+        if self.validator is not None:
+            self.validator.close()
+        if self.index is not None:
+            self.index.close()
+        self.file = file
+        self.index = ChallengeIndex(file)
+        self.validator = Validator(file, self.index, courses=self.courses)
+        self.validator.listeners.append(lambda rows: self.validatedTimer.start(0))
+        self.validatedTimer.start(0)
+        self.model.setFile(file)
+        self.HandleFilter(self.filter.text())
+
+        # Selecting the first challenge updates the fields
+        self.ChallengeList.setCurrentIndex(self.model.index(0))
+
+        # Enable buttons, if there is a challenge to edit
+        editable = len(file.challenges) > 0
+        for widget in (self.save, self.Category, self.powerup, self.babyyoshi):
+            widget.setEnabled(editable)
+        if not editable:
+            self.showStars(0)
+            self.starsplus.setEnabled(False)
+
+    def setCourses(self, courses):
+        """Checks the challenges against a course folder's index"""
+        self.courses = courses
+        if self.validator is not None:
+            self.validator.setCourses(courses)
+
+    def refresh(self):
+        """Shows changes made to the file elsewhere"""
+        if self.model.rowCount() == 0: return
+        self.model.dataChanged.emit(self.model.index(0), self.model.index(self.model.rowCount() - 1))
+        self.updateFields(self.challenge)
+
+    def saveFile(self):
+        """Returns the file in saved form"""
+        return self.file.save()
+
+    def HandleFilter(self, text):
+        """Hides the challenges that don't match the find expression"""
+        rows = None
+        if self.index is not None and text.strip() != '':
+            try:
+                rows = set(self.index.select(text))
+                self.filter.setToolTip('')
+            except (ValueError, SyntaxError, TypeError, NameError, ZeroDivisionError) as e:
+                self.filter.setToolTip(str(e))
+                return
+
+        for row in range(self.model.rowCount()):
+            self.ChallengeList.setRowHidden(row, rows is not None and row not in rows)
+
+    def HandleDifferentChallenge(self, newitem, olditem):
+        """Handles a different challenge being chosen"""
+        if not newitem.isValid(): return
+        self.challenge = newitem.row()
+        self.updateFields(self.challenge)
+
+    @timed('ChallengeViewer.updateFields')
+    def updateFields(self, challenge):
+        """Updates fields"""
+        challenge = self.file.challenges[self.challenge]
+
+        # Stars are special
+        self.initstars(challenge)
+
+        # Setting a widget doesn't emit its signals; each repaints only itself
+        for field, widget in self.bindings:
+            value = getattr(challenge, field.name) + field.shown
+            blocked = widget.blockSignals(True)
+            if isinstance(widget, QtWidgets.QComboBox):
+                widget.setCurrentIndex(value)
+            elif isinstance(widget, QtWidgets.QSpinBox):
+                widget.setValue(value)
+            else:
+                widget.setText(str(value))
+                if widget.styleSheet() != '':
+                    widget.setStyleSheet('')
+            widget.blockSignals(blocked)
+            self.shownStates[field.name] = self.widgetState(widget)
+
+    def initstars(self, challenge):
+        """Inits the stars. Out of range counts are shown as 1 or 5, but only
+        changed in the file by the star buttons, so viewing isn't an edit."""
+        self.showStars(shownStars(challenge.stars))
+
+    def showStars(self, stars):
+        """Shows the given number of stars and updates the buttons"""
+        for i, star in enumerate(self.starLabels):
+            star.setVisible(i < stars)
+        self.shownStars = stars
+
+        self.starsplus.setEnabled(stars < 5)
+        self.starsmin.setEnabled(stars > 1)
+
+    def widgetState(self, widget):
+        """Returns what a field's widget shows, to tell whether it was changed"""
+        if isinstance(widget, QtWidgets.QComboBox):
+            return widget.currentIndex()
+        if isinstance(widget, QtWidgets.QSpinBox):
+            return widget.value()
+        return widget.text()
+
+    def readField(self, field, widget):
+        """Returns the value of a field from its widget; raises ValueError if it can't be saved"""
+        if isinstance(widget, QtWidgets.QComboBox):
+            if widget.currentIndex() < 0:
+                raise ValueError('%s is not one of the choices' % field.name)
+            return widget.currentIndex()
+        if isinstance(widget, QtWidgets.QSpinBox):
+            return widget.value() - field.shown
+
+        try:
+            value = int(widget.text()) - field.shown
+        except ValueError:
+            raise ValueError('%s is not a number' % field.name)
+        low, high = FieldRanges[field.name]
+        if not low <= value <= high:
+            raise ValueError('%s must be between %d and %d' % (field.name, low + field.shown, high + field.shown))
+        return value
+
+    def HandleFieldEdited(self, field, widget, text):
+        """Marks a field whose typed value can't be saved"""
+        try:
+            self.readField(field, widget)
+            widget.setStyleSheet('')
+            widget.setToolTip('')
+        except ValueError as e:
+            widget.setStyleSheet('background-color: #ffc0c0')
+            widget.setToolTip(str(e))
+
+    @timed('ChallengeViewer.saveFields')
+    def saveFields(self, eventsthatarenotneededbutneedtobeherebecauseotherwisethesignatureswontmatch):
+        """Save all fields"""
+        challenge = self.file.challenges[self.challenge]
+
+        # Only the fields changed in their widgets are saved, so values the
+        # widgets can't show (a category past the list, a time over 999)
+        # are kept as they are. Stars are saved by their buttons.
+        try:
+            values = [(field.name, self.readField(field, widget)) for field, widget in self.bindings
+                if self.widgetState(widget) != self.shownStates.get(field.name)]
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self, 'Save this challenge', 'This challenge was not saved: %s.' % e)
+            return
+
+        for name, value in values:
+            setattr(challenge, name, value)
+        self.model.updateRow(self.challenge)
+        self.edited.emit()
+
+    def addStar(self, stuff):
+        """Adds a star"""
+        self.file.challenges[self.challenge].stars = self.shownStars + 1
+        self.showStars(self.shownStars + 1)
+        self.model.updateRow(self.challenge)
+        self.edited.emit()
+
+    def removeStar(self, stuff):
+        """Removes a star"""
+        self.file.challenges[self.challenge].stars = self.shownStars - 1
+        self.showStars(self.shownStars - 1)
+        self.model.updateRow(self.challenge)
+        self.edited.emit()
+
+
+class ProfileStats(QtWidgets.QDialog):
+    """Dialog that shows the timings recorded by instrument.py, updated while it is open"""
+    Columns = ('Path', 'Calls', 'Total (ms)', 'Mean (ms)', 'Max (ms)', 'Blocks/call')
+
+    def __init__(self, parent=None):
+        """Initialises the dialog"""
+        QtWidgets.QDialog.__init__(self, parent)
+        self.setWindowTitle('Challenge Editor - Profiling Stats')
+
+        self.table = QtWidgets.QTableWidget(0, len(self.Columns))
+        self.table.setHorizontalHeaderLabels(self.Columns)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+
+        resetButton = QtWidgets.QPushButton('Reset')
+        resetButton.clicked.connect(self.HandleReset)
+        saveButton = QtWidgets.QPushButton('Save Trace...')
+        saveButton.clicked.connect(self.HandleSaveTrace)
+        buttonBox = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Close)
+        buttonBox.addButton(resetButton, QtWidgets.QDialogButtonBox.ResetRole)
+        buttonBox.addButton(saveButton, QtWidgets.QDialogButtonBox.ActionRole)
+        buttonBox.rejected.connect(self.reject)
+
+        layout = QtWidgets.QVBoxLayout()
+        layout.addWidget(self.table)
+        layout.addWidget(buttonBox)
+        self.setLayout(layout)
+        self.resize(640, 320)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(500)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        """Starts updating the table"""
+        self.refresh()
+        self.timer.start()
+        QtWidgets.QDialog.showEvent(self, event)
+
+    def hideEvent(self, event):
+        """Stops updating the table"""
+        self.timer.stop()
+        QtWidgets.QDialog.hideEvent(self, event)
+
+    def refresh(self):
+        """Shows the current totals"""
+        rows = instrument.summary()
+        self.table.setRowCount(len(rows))
+        for row, (path, calls, total, mean, longest, blocks) in enumerate(rows):
+            cells = (path, '%d' % calls, '%.2f' % (total * 1000), '%.3f' % (mean * 1000), '%.3f' % (longest * 1000), '%.0f' % blocks)
+            for column, text in enumerate(cells):
+                item = QtWidgets.QTableWidgetItem(text)
+                if column > 0:
+                    item.setTextAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+    def HandleReset(self):
+        """Forgets the timings so far"""
+        instrument.reset()
+        self.refresh()
+
+    def HandleSaveTrace(self):
+        """Saves the timings as a Chrome trace"""
+        fp = QtWidgets.QFileDialog.getSaveFileName(self, 'Save Trace', 'trace.json', 'Chrome trace files (*.json);;All Files (*.*)')[0]
+        if fp == '': return
+        instrument.saveTrace(fp)
+
+
+class FileTask(QtCore.QThread):
+    """Runs a load or save on a worker thread. The function is called as
+    function(progress), and progress returns False once it is cancelled."""
+    progress = QtCore.pyqtSignal(int, int)
+    succeeded = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, function):
+        """Initialises the task"""
+        QtCore.QThread.__init__(self)
+        self.function = function
+        self.cancelled = False
+
+    def run(self):
+        """Runs the function and reports how it went"""
+        try:
+            result = self.function(self.reportProgress)
+        except Cancelled:
+            return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        if not self.cancelled:
+            self.succeeded.emit(result)
+
+    def reportProgress(self, done, total):
+        """Passes progress on to the GUI thread; returns whether to go on"""
+        self.progress.emit(done, total)
+        return not self.cancelled
+
+    def cancel(self):
+        """Asks the function to stop at its next progress report"""
+        self.cancelled = True
+
+
+# How much file data the inactive tabs may keep parsed. Past this, the least
+# recently shown tabs without unsaved edits let go of their file, and read it
+# again when they are shown; tabs with unsaved edits are always kept.
+LoadedBudget = 1024 * 1024
+
+class Document():
+    """A file open in a tab"""
+    def __init__(self, fp, mapped=False):
+        """Initialises the document; its file is attached once it is read"""
+        self.fp = fp # file path
+        self.sourceFp = fp # path the file was loaded from or last fully saved to
+        self.mapped = mapped
+        self.file = None # None while evicted
+        self.history = None # undo/redo, kept while evicted
+        self.diskData = None # what the file was loaded from or saved as, to see what others changed
+        self.checksum = None # of diskData, kept while evicted
+        self.row = 0 # the challenge shown, kept while inactive
+
+    def isDirty(self):
+        """Returns whether the document has unsaved edits"""
+        if self.file is None or self.mapped: return False
+        return bool(self.history.pending or self.file.header != self.file.savedHeader or self.file.dirtyIndices())
+
+    def loadedSize(self):
+        """Returns how much file data the document keeps parsed"""
+        if self.file is None: return 0
+        return len(self.file.map) if self.mapped else len(self.diskData)
+
+    def evict(self):
+        """Lets go of the file; it must have no unsaved edits"""
+        autosave = self.history.autosave
+        self.history.detach()
+        if autosave is not None:
+            # Nothing in it to recover
+            autosave.clear(autosave.checksum)
+        if self.mapped:
+            self.file.close()
+        self.file = None
+        self.diskData = None
+
+
+class MainWindow(QtWidgets.QMainWindow):
+    """Main window"""
+    def __init__(self):
+        """Initialises the window"""
+        QtWidgets.QMainWindow.__init__(self)
+        self.task = None # the load or save running in the background
+        self.documents = [] # the open files, least recently shown first
+        self.document = None # the one shown
+
+        # Create the viewer, shared by the tabs
+        self.view = ChallengeViewer()
+        self.tabs = QtWidgets.QTabBar()
+        self.tabs.setDocumentMode(True)
+        self.tabs.setExpanding(False)
+        self.tabs.setMovable(True)
+        self.tabs.setTabsClosable(True)
+        self.tabs.currentChanged.connect(self.HandleTabChanged)
+        self.tabs.tabCloseRequested.connect(self.HandleTabClose)
+
+        central = QtWidgets.QWidget()
+        L = QtWidgets.QVBoxLayout()
+        L.setContentsMargins(0, 0, 0, 0)
+        L.setSpacing(0)
+        L.addWidget(self.tabs)
+        L.addWidget(self.view)
+        central.setLayout(L)
+        self.setCentralWidget(central)
+
+        # The table is only created when it is first shown
+        self.table = None
+        self.stats = None
+
+        # Diagnostics panel
+        self.problems = QtWidgets.QListWidget()
+        self.problems.itemActivated.connect(self.HandleProblemActivated)
+        self.problemsDock = QtWidgets.QDockWidget('Diagnostics')
+        self.problemsDock.setObjectName('Diagnostics')
+        self.problemsDock.setWidget(self.problems)
+        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.problemsDock)
+        self.view.problemsChanged.connect(self.HandleProblemsChanged)
+
+        # Files written by other programs are reloaded once the writes stop
+        self.watcher = QtCore.QFileSystemWatcher()
+        self.watcher.fileChanged.connect(self.HandleFileChanged)
+        self.changedPaths = set()
+        self.reloadTimer = QtCore.QTimer()
+        self.reloadTimer.setSingleShot(True)
+        self.reloadTimer.setInterval(300)
+        self.reloadTimer.timeout.connect(self.HandleReload)
+        self.reloadTask = None
+
+        # Create the menubar and a few actions
+        self.CreateMenubar()
+
+        # Set window title and show the window
+        self.setWindowTitle('Challenge Editor')
+        self.show()
+
+    def CreateMenubar(self):
+        """Sets up the menubar"""
+        m = self.menuBar()
+
+        # File Menu
+        f = m.addMenu('&File')
+
+        openAct = f.addAction('Open File...')
+        openAct.setIcon(getIcon("open"))
+        openAct.setShortcut('Ctrl+O') 
+        openAct.triggered.connect(self.HandleOpen)
+
+        openMappedAct = f.addAction('Open File (Memory-Mapped)...')
+        openMappedAct.setIcon(getIcon("open"))
+        openMappedAct.setShortcut('Ctrl+Shift+O')
+        openMappedAct.triggered.connect(self.HandleOpenMapped)
+
+        self.saveAct = f.addAction('Save File')
+        self.saveAct.setIcon(getIcon("save"))
+        self.saveAct.setShortcut('Ctrl+S')
+        self.saveAct.triggered.connect(self.HandleSave)
+        self.saveAct.setEnabled(False)
+
+        self.saveAsAct = f.addAction('Save File As...')
+        self.saveAsAct.setIcon(getIcon("saveas"))
+        self.saveAsAct.setShortcut('Ctrl+Shift+S')
+        self.saveAsAct.triggered.connect(self.HandleSaveAs)
+        self.saveAsAct.setEnabled(False)
+
+        f.addSeparator()
+
+        self.compareAct = f.addAction('Compare With...')
+        self.compareAct.triggered.connect(self.HandleCompare)
+        self.compareAct.setEnabled(False)
+
+        self.mergeAct = f.addAction('Merge...')
+        self.mergeAct.triggered.connect(self.HandleMerge)
+        self.mergeAct.setEnabled(False)
+
+        coursesAct = f.addAction('Check Against Course Folder...')
+        coursesAct.triggered.connect(self.HandleCourses)
+
+        f.addSeparator()
+
+        exitAct = f.addAction('Exit')
+        exitAct.setIcon(getIcon("exit"))
+        exitAct.setShortcut('Ctrl+Q')
+        exitAct.triggered.connect(self.HandleExit)
+
+        # Edit Menu
+        e = m.addMenu('&Edit')
+
+        self.undoAct = e.addAction('Undo')
+        self.undoAct.setShortcut(QtGui.QKeySequence.Undo)
+        self.undoAct.triggered.connect(self.HandleUndo)
+        self.undoAct.setEnabled(False)
+
+        self.redoAct = e.addAction('Redo')
+        self.redoAct.setShortcut(QtGui.QKeySequence.Redo)
+        self.redoAct.triggered.connect(self.HandleRedo)
+        self.redoAct.setEnabled(False)
+
+        # View Menu
+        v = m.addMenu('&View')
+
+        self.tableAct = v.addAction('Table Editor...')
+        self.tableAct.setShortcut('Ctrl+T')
+        self.tableAct.triggered.connect(self.HandleTable)
+        self.tableAct.setEnabled(False)
+
+        self.prequelAct = v.addAction('Prequel Chains...')
+        self.prequelAct.triggered.connect(self.HandlePrequels)
+        self.prequelAct.setEnabled(False)
+
+        v.addAction(self.problemsDock.toggleViewAction())
+
+        if instrument.Enabled:
+            statsAct = v.addAction('Profiling Stats...')
+            statsAct.triggered.connect(self.HandleStats)
+
+        # Help Menu
+        h = m.addMenu('&Help')
+
+        aboutAct = h.addAction('About...')
+        aboutAct.setIcon(getIcon("about"))
+        aboutAct.setShortcut('Ctrl+H')
+        aboutAct.triggered.connect(self.HandleAbout)
+
+    def HandleOpen(self):
+        """Handles file opening"""
+        fp = QtWidgets.QFileDialog.getOpenFileName(self, 'Open File', '', 'Challenge data files (*.exbin);;All Files (*.*)')[0]
+        if fp == '': return
+        if self.showOpen(fp): return
+
+        @timed('HandleOpen: read and parse')
+        def load(progress):
+            # Finish a save that was interrupted, then read the file and
+            # any edits autosaved before a crash
+            replayJournal(fp)
+            data = readFile(fp, progress)
+            checksum = dataChecksum(data)
+            return File(data), checksum, readAutosave(fp, checksum), data
+
+        self.runTask('Opening %s...' % os.path.basename(fp), load, functools.partial(self.HandleOpened, fp))
+
+    @timed('HandleOpen: show')
+    def HandleOpened(self, fp, loaded, document=None):
+        """Shows a file that was loaded in the background, in a new tab or
+        in place of the file of a document"""
+        file, checksum, log, data = loaded
+
+        recover = False
+        if log is not None and log[0]:
+            recover = QtWidgets.QMessageBox.question(self, 'Challenge Editor',
+                '%s has %d autosaved edit(s) that were never saved. Recover them?' % (os.path.basename(fp), len(log[0]))) == QtWidgets.QMessageBox.Yes
+        autosave = Autosave(fp, checksum, log[1] if recover else None)
+        if not recover:
+            autosave.clear(checksum)
+
+        new = document is None
+        if new:
+            document = Document(fp)
+        elif document.history is not None:
+            # Starting over, so the old edits can't be undone
+            document.history.close()
+            document.history = None
+        document.sourceFp = fp
+        document.diskData = data
+        document.checksum = checksum
+        self.attach(document, file, autosave)
+        if new or document is self.document:
+            self.activate(document)
+        if recover:
+            self.showEdits(document.history.recover(log[0]))
+
+    def HandleOpenMapped(self):
+        """Handles opening a file that is edited in place"""
+        fp = QtWidgets.QFileDialog.getOpenFileName(self, 'Open File (Memory-Mapped)', '', 'Challenge data files (*.exbin);;All Files (*.*)')[0]
+        if fp == '': return
+        if self.showOpen(fp): return
+
+        # Map the file; edits go straight to it
+        try:
+            replayJournal(fp)
+            file = MappedFile(fp)
+        except (OSError, ValueError) as e:
+            QtWidgets.QMessageBox.warning(self, 'Challenge Editor', 'Opening %s failed: %s' % (os.path.basename(fp), e))
+            return
+        document = Document(fp, mapped=True)
+        self.attach(document, file)
+        self.activate(document)
+
+    def showOpen(self, fp):
+        """Shows the tab of a file if it is already open; returns whether it was"""
+        fp = os.path.abspath(fp)
+        for document in self.documents:
+            if fp in (os.path.abspath(document.fp), os.path.abspath(document.sourceFp)):
+                self.activate(document)
+                return True
+        return False
+
+    def attach(self, document, file, autosave=None):
+        """Gives a document the file read for it, adding a tab if it is new"""
+        document.file = file
+        if document.history is None:
+            document.history = History(file, autosave)
+            document.history.listeners.append(functools.partial(self.HandleHistoryChanged, document))
+        else:
+            document.history.attach(file, autosave)
+
+        if document not in self.documents:
+            self.documents.insert(0, document)
+            blocked = self.tabs.blockSignals(True)
+            self.tabs.setTabData(self.tabs.addTab(''), document)
+            self.tabs.blockSignals(blocked)
+        self.updateTab(document)
+
+    def activate(self, document):
+        """Shows a document, reading its file again if it was evicted"""
+        if document.file is None:
+            self.restore(document)
+            return
+
+        if document is not self.document or self.view.file is not document.file:
+            if self.document not in (None, document) and self.document.file is not None:
+                self.document.row = self.view.challenge
+            self.document = document
+            self.setFile(document.file)
+            if document.row < self.view.model.rowCount():
+                self.view.ChallengeList.setCurrentIndex(self.view.model.index(document.row))
+        self.documents.remove(document)
+        self.documents.append(document)
+        self.syncTab()
+        self.evict()
+        self.watch()
+
+        # Enable saving
+        #a = False
+        a = True
+        self.saveAct.setEnabled(a)
+        self.saveAsAct.setEnabled(a)
+
+    def restore(self, document):
+        """Reads the file of an evicted document again, then shows it"""
+        if document.mapped:
+            try:
+                replayJournal(document.sourceFp)
+                file = MappedFile(document.sourceFp)
+            except (OSError, ValueError) as e:
+                QtWidgets.QMessageBox.warning(self, 'Challenge Editor', 'Opening %s failed: %s' % (os.path.basename(document.sourceFp), e))
+                self.syncTab()
+                return
+            self.attach(document, file)
+            self.activate(document)
+            return
+
+        fp = document.sourceFp
+        def load(progress):
+            data = readFile(fp, progress)
+            return File(data), data
+
+        task = self.runTask('Opening %s...' % os.path.basename(fp), load, functools.partial(self.HandleRestored, document))
+        if task is not None:
+            # Go back to the shown tab if it fails or is cancelled
+            task.finished.connect(self.syncTab)
+        else:
+            self.syncTab()
+
+    def HandleRestored(self, document, loaded):
+        """Shows a document whose file was read again"""
+        if document not in self.documents: return
+        file, data = loaded
+        checksum = dataChecksum(data)
+        if checksum != document.checksum:
+            # Changed on disk meanwhile; the undo steps were made to the old data
+            document.history.undoStack = []
+            document.history.redoStack = []
+        document.diskData = data
+        document.checksum = checksum
+        self.attach(document, file, Autosave(document.sourceFp, checksum))
+        self.activate(document)
+
+    def evict(self):
+        """Lets go of the files of the least recently shown documents without
+        unsaved edits, while the inactive ones keep more than LoadedBudget"""
+        inactive = [document for document in self.documents if document.file is not None and document is not self.document]
+        size = sum(document.loadedSize() for document in inactive)
+        for document in inactive:
+            if size <= LoadedBudget: break
+            if document.isDirty(): continue
+            size -= document.loadedSize()
+            document.evict()
+
+    def syncTab(self):
+        """Selects the tab of the shown document"""
+        for i in range(self.tabs.count()):
+            if self.tabs.tabData(i) is self.document:
+                blocked = self.tabs.blockSignals(True)
+                self.tabs.setCurrentIndex(i)
+                self.tabs.blockSignals(blocked)
+
+    def updateTab(self, document):
+        """Shows the name of a document's file, and whether it has unsaved edits"""
+        for i in range(self.tabs.count()):
+            if self.tabs.tabData(i) is document:
+                self.tabs.setTabText(i, ('*' if document.isDirty() else '') + os.path.basename(document.fp))
+                self.tabs.setTabToolTip(i, document.fp)
+        if document is self.document:
+            self.setWindowTitle('Challenge Editor - %s' % os.path.basename(document.fp))
+
+    def HandleTabChanged(self, i):
+        """Shows the document of the chosen tab"""
+        if i < 0: return
+        self.activate(self.tabs.tabData(i))
+
+    def HandleTabClose(self, i):
+        """Closes the document of a tab"""
+        document = self.tabs.tabData(i)
+        if document.isDirty() and QtWidgets.QMessageBox.question(self, 'Challenge Editor',
+            '%s has unsaved edits. Close it anyway? They can be recovered from the autosave when it is opened again.' % os.path.basename(document.fp)) != QtWidgets.QMessageBox.Yes:
+            return
+
+        if document.file is not None:
+            document.history.close()
+            if document.mapped:
+                document.file.close()
+        self.documents.remove(document)
+        blocked = self.tabs.blockSignals(True)
+        self.tabs.removeTab(i)
+        self.tabs.blockSignals(blocked)
+
+        if document is self.document:
+            self.document = None
+            if self.documents:
+                self.activate(self.documents[-1])
+            else:
+                self.clear()
+        self.watch()
+
+    def clear(self):
+        """Shows no file, after the last tab was closed"""
+        self.setFile(File())
+        for act in (self.undoAct, self.redoAct, self.saveAct, self.saveAsAct, self.tableAct, self.prequelAct, self.compareAct, self.mergeAct):
+            act.setEnabled(False)
+        self.undoAct.setText('Undo')
+        self.redoAct.setText('Redo')
+        self.setWindowTitle('Challenge Editor')
+
+    def setFile(self, file):
+        """Shows a file in the viewer and the table"""
+        if self.document is not None:
+            self.HandleHistoryChanged(self.document)
+
+        self.view.setFile(file)
+        if self.table is not None:
+            self.table.setFile(file)
+        self.tableAct.setEnabled(True)
+        self.prequelAct.setEnabled(True)
+        self.compareAct.setEnabled(True)
+        self.mergeAct.setEnabled(True)
+
+    def HandleHistoryChanged(self, document):
+        """Makes the edits of one event loop turn an undo step, and updates the actions"""
+        history = document.history
+        if history.pending:
+            QtCore.QTimer.singleShot(0, history.commit)
+        self.updateTab(document)
+        if document is not self.document: return
+        self.undoAct.setEnabled(history.canUndo())
+        self.redoAct.setEnabled(history.canRedo())
+        self.undoAct.setText('Undo %s' % history.undoLabel() if history.undoStack else 'Undo')
+        self.redoAct.setText('Redo %s' % history.redoLabel() if history.canRedo() else 'Redo')
+
+    def HandleUndo(self):
+        """Undoes the last edit"""
+        self.showEdits(self.document.history.undo())
+
+    def HandleRedo(self):
+        """Redoes the last undone edit"""
+        self.showEdits(self.document.history.redo())
+
+    def showEdits(self, rows):
+        """Shows the challenges changed by an undo, redo or recovery"""
+        if rows and self.view.challenge not in rows:
+            self.view.ChallengeList.setCurrentIndex(self.view.model.index(rows[0]))
+        self.view.refresh()
+        if self.table is not None:
+            self.table.model.refresh()
+
+    def watch(self):
+        """Watches the files the loaded documents were loaded from or saved to"""
+        paths = set(document.sourceFp for document in self.documents if document.file is not None and os.path.exists(document.sourceFp))
+        watched = set(self.watcher.files())
+        if watched - paths:
+            self.watcher.removePaths(list(watched - paths))
+        if paths - watched:
+            self.watcher.addPaths(list(paths - watched))
+
+    def HandleFileChanged(self, fp):
+        """Waits for another program to finish writing a file"""
+        self.changedPaths.add(fp)
+        self.reloadTimer.start()
+
+    def HandleReload(self):
+        """Reads the files again that another program wrote, one at a time"""
+        if self.task is not None or self.reloadTask is not None:
+            # Try again when our own load or save is done
+            self.reloadTimer.start()
+            return
+
+        while self.changedPaths:
+            fp = self.changedPaths.pop()
+            document = None
+            for other in self.documents:
+                if other.file is not None and other.sourceFp == fp:
+                    document = other
+            if document is None or not os.path.exists(fp): continue
+
+            # Files replaced by renaming them over the old one stop being watched
+            self.watcher.removePath(fp)
+            self.watcher.addPath(fp)
+
+            if document.mapped:
+                # The mapping already shows what was written
+                if document is self.document:
+                    self.showEdits([])
+                continue
+
+            task = self.reloadTask = FileTask(lambda progress: readFile(fp))
+            task.succeeded.connect(functools.partial(self.HandleReloaded, document, fp))
+            task.failed.connect(lambda message: self.statusBar().showMessage('Could not reload %s: %s' % (os.path.basename(fp), message), 5000))
+            task.finished.connect(self.HandleReloadFinished)
+            task.start()
+            return
+
+    def HandleReloadFinished(self):
+        """Forgets the reload task, and goes on to the next changed file"""
+        self.reloadTask = None
+        if self.changedPaths:
+            self.reloadTimer.start()
+
+    def HandleReloaded(self, document, fp, data):
+        """Applies the records another program changed, keeping unsaved edits"""
+        if fp != document.sourceFp or document.file is None or document.diskData is None or data == document.diskData: return
+        file = document.file
+        shown = document is self.document
+        applied, conflicts, skipped = document.history.applyExternal(lambda: merge.reloadChanges(file, document.diskData, data))
+
+        if skipped:
+            if not document.isDirty():
+                # Challenges were added or removed; with nothing to lose, start over
+                if shown:
+                    document.row = self.view.challenge
+                self.HandleOpened(fp, (File(data), dataChecksum(data), None, data), document)
+                self.statusBar().showMessage('Reloaded %s' % os.path.basename(fp), 5000)
+                return
+
+        document.diskData = data
+        document.checksum = dataChecksum(data)
+        document.history.restartAutosave(document.checksum, merge.diffData(data, file.save()))
+        self.updateTab(document)
+        if not shown:
+            self.statusBar().showMessage('Reloaded %d change(s) to %s from disk, %d conflict(s)' % (len(applied), os.path.basename(fp), len(conflicts)), 5000)
+            return
+
+        rows = sorted(set(change.index for change in applied if change.index is not None))
+        for row in rows:
+            self.view.model.updateRow(row)
+            if self.table is not None:
+                self.table.model.dataChanged.emit(self.table.model.index(row, 0), self.table.model.index(row, self.table.model.columnCount() - 1))
+        if self.view.challenge in rows:
+            self.view.updateFields(self.view.challenge)
+
+        self.statusBar().showMessage('Reloaded %d change(s) to %s from disk, %d conflict(s)' % (len(applied), os.path.basename(fp), len(conflicts)), 5000)
+        if conflicts or skipped:
+            lines = []
+            if conflicts:
+                lines.append('Changed on disk where there are unsaved edits (the edits were kept, saving will overwrite the disk):')
+                lines += [merge.formatConflict(conflict) for conflict in conflicts]
+            if skipped:
+                lines.append('\nNot reloaded (added or removed challenges, trailing data):')
+                lines += [merge.formatChange(change) for change in skipped]
+            self.showText('Reload Conflicts', '\n'.join(lines).strip())
+
+    def HandleProblemsChanged(self):
+        """Lists the problems the validator found"""
+        self.problems.clear()
+        for problem in self.view.validator.sortedProblems():
+            item = QtWidgets.QListWidgetItem(formatProblem(problem))
+            item.setData(QtCore.Qt.UserRole, problem.row)
+            self.problems.addItem(item)
+        self.problemsDock.setWindowTitle('Diagnostics (%d)' % self.problems.count())
+
+    def HandleProblemActivated(self, item):
+        """Shows the challenge a problem is about"""
+        self.view.ChallengeList.setCurrentIndex(self.view.model.index(item.data(QtCore.Qt.UserRole)))
+
+    def HandleStats(self):
+        """Shows the profiling stats"""
+        if self.stats is None:
+            self.stats = ProfileStats(self)
+        self.stats.show()
+        self.stats.raise_()
+
+    def HandlePrequels(self):
+        """Shows the prequel chains, their unlock order and any problems with them"""
+        self.showText('Prequel Chains', prequelReport(self.view.index))
+
+    def HandleCompare(self):
+        """Lists the differences between the viewed file and another one"""
+        fp = QtWidgets.QFileDialog.getOpenFileName(self, 'Compare With', '', 'Challenge data files (*.exbin);;All Files (*.*)')[0]
+        if fp == '': return
+
+        ours = self.view.saveFile()
+
+        def compared(changes):
+            text = '\n'.join(merge.formatChange(change) for change in changes) or 'The files are the same.'
+            self.showText('Compare', text)
+
+        self.runTask('Comparing...', lambda progress: merge.diffData(ours, readFile(fp, progress)), compared)
+
+    def HandleMerge(self):
+        """Merges the changes made in another copy of the file into the viewed one"""
+        base = QtWidgets.QFileDialog.getOpenFileName(self, 'Merge - Choose the original file', '', 'Challenge data files (*.exbin);;All Files (*.*)')[0]
+        if base == '': return
+        theirs = QtWidgets.QFileDialog.getOpenFileName(self, 'Merge - Choose the edited copy to merge in', '', 'Challenge data files (*.exbin);;All Files (*.*)')[0]
+        if theirs == '': return
+
+        ours = self.view.saveFile()
+
+        def load(progress):
+            merged, conflicts = merge.mergeData(readFile(base, progress), ours, readFile(theirs, progress))
+            return merge.diffData(ours, merged), conflicts
+
+        def merged(result):
+            changes, conflicts = result
+            skipped = merge.applyChanges(self.view.file, changes)
+            self.view.refresh()
+            if self.table is not None:
+                self.table.model.refresh()
+
+            lines = ['Merged %d change(s).' % (len(changes) - len(skipped))]
+            if skipped:
+                lines.append('\nNot merged (added or removed challenges, trailing data):')
+                lines += [merge.formatChange(change) for change in skipped]
+            if conflicts:
+                lines.append('\nConflicts (the viewed file was kept):')
+                lines += [merge.formatConflict(conflict) for conflict in conflicts]
+            self.showText('Merge', '\n'.join(lines))
+
+        self.runTask('Merging...', load, merged)
+
+    def HandleCourses(self):
+        """Indexes the game's course folder, to check each challenge's level, area and entrance"""
+        folder = QtWidgets.QFileDialog.getExistingDirectory(self, 'Choose the course folder')
+        if folder == '': return
+
+        def scanned(courses):
+            self.view.setCourses(courses)
+            self.statusBar().showMessage('Checking against %d level(s) in %s' % (len(courses.archives), folder), 5000)
+
+        self.runTask('Reading course folder...', lambda progress: scanCourses(folder, progress=progress), scanned)
+
+    def HandleTable(self):
+        """Shows the table editor"""
+        if self.table is None:
+            self.table = ChallengeTable()
+            self.table.setFile(self.view.file)
+            self.table.model.edited.connect(self.view.refresh)
+            self.view.edited.connect(self.table.model.refresh)
+        self.table.show()
+        self.table.raise_()
+
+    def HandleSave(self):
+        """Handles file saving"""
+        self.saveTo(self.document.fp)
+
+    @timed('HandleSave')
+    def saveTo(self, fp):
+        """Saves the viewed file to fp in the background"""
+        document = self.document
+        file = document.file
+        mapped = document.mapped
+        if mapped and file.fp == fp:
+            # Already written in place
+            save = lambda progress: file.flush()
+        elif fp == document.sourceFp:
+            # Only rewrite the challenges that changed
+            save = functools.partial(writeChanges, fp, file.incrementalChanges())
+        else:
+            # Write to a temporary file and swap it in
+            save = functools.partial(writeAtomic, fp, self.view.saveFile())
+
+        def saved(result):
+            document.fp = fp
+            if not mapped:
+                document.sourceFp = fp
+                file.markClean()
+
+                # The autosaved edits are in the file now
+                document.diskData = file.save()
+                document.checksum = dataChecksum(document.diskData)
+                if document.history.autosave is not None:
+                    document.history.autosave.clear(document.checksum)
+                document.history.autosave = Autosave(fp, document.checksum)
+            self.updateTab(document)
+            self.watch()
+
+        self.runTask('Saving %s...' % os.path.basename(fp), timed('HandleSave: write')(save), saved)
+
+    def HandleSaveAs(self):
+        """Handles saving to a new file"""
+        fp = QtWidgets.QFileDialog.getSaveFileName(self, 'Save File', '', 'Challenge data files (*.exbin);;All Files (*.*)')[0]
+        if fp == '': return
+
+        # Save it
+        self.saveTo(fp)
+
+        # Enable saving
+        #self.saveAct.setEnabled(True)
+
+    def runTask(self, label, function, done):
+        """Runs function(progress) on a worker thread, with a progress dialog
+        that can cancel it, and calls done(result) if it succeeds. Editing is
+        disabled meanwhile, so a save writes exactly what is marked clean.
+        Returns the task, or None if another one is running."""
+        if self.task is not None: return
+        task = self.task = FileTask(function)
+
+        dialog = QtWidgets.QProgressDialog(label, 'Cancel', 0, 0, self)
+        dialog.setWindowTitle('Challenge Editor')
+        dialog.setWindowModality(QtCore.Qt.WindowModal)
+        dialog.setMinimumDuration(500)
+        dialog.canceled.connect(task.cancel)
+
+        def progress(value, total):
+            dialog.setMaximum(max(total, 1))
+            dialog.setValue(value)
+
+        def failed(message):
+            QtWidgets.QMessageBox.warning(self, 'Challenge Editor', '%s failed: %s' % (label.rstrip('.'), message))
+
+        def finished():
+            dialog.canceled.disconnect(task.cancel)
+            dialog.reset()
+            dialog.deleteLater()
+            self.task = None
+            self.setBusy(False)
+
+        task.progress.connect(progress)
+        task.succeeded.connect(done)
+        task.failed.connect(failed)
+        task.finished.connect(finished)
+        self.setBusy(True)
+        task.start()
+        return task
+
+    def setBusy(self, busy):
+        """Disables editing and the menus while a load or save runs"""
+        self.view.setEnabled(not busy)
+        self.tabs.setEnabled(not busy)
+        self.menuBar().setEnabled(not busy)
+        if self.table is not None:
+            self.table.setEnabled(not busy)
+
+    def HandleExit(self):
+        """Exits"""
+        if self.task is not None:
+            self.task.cancel()
+            self.task.wait()
+        for document in self.documents:
+            if document.file is not None:
+                document.history.close()
+        raise SystemExit
+
+    def HandleAbout(self):
+        """Shows the About dialog"""
+        try: readme = open(os.path.join(Here, 'about.txt'), 'r').read()
+        except: readme = 'Challenge Data Editor %s by Grop\n(No about.txt found!)\nLicensed under GPL 3' % version
+        self.showText('About', readme)
+
+    def showText(self, title, text):
+        """Shows some text in a dialog"""
+        txtedit = QtWidgets.QPlainTextEdit(text)
+        txtedit.setReadOnly(True)
+
+        buttonBox = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok)
+
+        layout = QtWidgets.QVBoxLayout()
+        layout.addWidget(txtedit)
+        layout.addWidget(buttonBox)
+
+        dlg = QtWidgets.QDialog()
+        dlg.setLayout(layout)
+        dlg.setModal(True)
+        dlg.setWindowTitle('Challenge Editor - ' + title)
+
+        buttonBox.accepted.connect(dlg.accept)
+        dlg.exec_()
@@ -0,0 +1,268 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Challenge Editor - Edits NSMBU's challenge data file.
+# Copyright (C) 2016 Grop
+
+# history.py
+# Undo/redo of edits to a file, and the autosave log that recovers them after
+# a crash. Both keep per-field deltas (challenge, field, old, new) packed into
+# arrays, never copies of the file.
+
+################################################################
+################################################################
+
+import array
+import collections
+import os
+import struct
+import zlib
+
+from exbin import FieldNames
+
+FieldNumbers = dict((name, i) for i, name in enumerate(FieldNames))
+
+# deltas is an array('q') of (index, field number, old, new) quadruples
+Command = collections.namedtuple('Command', 'label deltas')
+
+
+def iterDeltas(deltas):
+    """Yields the (index, name, old, new) of an array of deltas"""
+    for i in range(0, len(deltas), 4):
+        yield deltas[i], FieldNames[deltas[i + 1]], deltas[i + 2], deltas[i + 3]
+
+
+def inverseDeltas(deltas):
+    """Returns deltas that undo some deltas, in reverse order"""
+    inverse = array.array('q')
+    for i in range(len(deltas) - 4, -1, -4):
+        inverse.extend((deltas[i], deltas[i + 1], deltas[i + 3], deltas[i + 2]))
+    return inverse
+
+
+def describeDeltas(deltas):
+    """Returns a short label for an edit"""
+    names = set(deltas[1::4])
+    rows = set(deltas[0::4])
+    if len(names) == 1:
+        name = FieldNames[deltas[1]]
+        return 'Edit %s' % name if len(rows) == 1 else 'Edit %s of %d challenges' % (name, len(rows))
+    return 'Edit %d fields' % (len(deltas) // 4)
+
+
+class History():
+    """Undo and redo stacks of the edits made to a file. Field changes are
+    gathered until commit() makes them one undoable step."""
+    def __init__(self, file, autosave=None):
+        """Starts following edits to the file"""
+        self.file = file
+        self.autosave = autosave
+        self.undoStack = []
+        self.redoStack = []
+        self.pending = array.array('q')
+        self.applying = False
+        self.listeners = [] # called as listener() when pending edits start or the stacks change
+        file.addObserver(self.fieldChanged)
+
+    def close(self):
+        """Stops following edits to the file"""
+        self.commit()
+        if self.file is not None:
+            self.file.removeObserver(self.fieldChanged)
+        if self.autosave is not None:
+            self.autosave.close()
+
+    def detach(self):
+        """Stops following edits and lets go of the file and its autosave
+        log, but keeps the stacks for when the file is attached again"""
+        self.close()
+        self.file = None
+        self.autosave = None
+
+    def attach(self, file, autosave=None):
+        """Follows edits to the file again after detach(), e.g. once it was
+        read back from disk"""
+        self.file = file
+        self.autosave = autosave
+        file.addObserver(self.fieldChanged)
+
+    def fieldChanged(self, index, name, old, new):
+        """Records a field change"""
+        if self.applying: return
+        started = not self.pending
+        self.pending.extend((index, FieldNumbers[name], old, new))
+        if started:
+            self.notify()
+
+    def commit(self, label=None):
+        """Makes the pending edits one undoable step"""
+        if not self.pending: return
+        deltas, self.pending = self.pending, array.array('q')
+        self.undoStack.append(Command(label or describeDeltas(deltas), deltas))
+        self.redoStack = []
+        if self.autosave is not None:
+            self.autosave.append(deltas)
+        self.notify()
+
+    def canUndo(self):
+        """Returns whether there is anything to undo"""
+        return bool(self.undoStack or self.pending)
+
+    def canRedo(self):
+        """Returns whether there is anything to redo"""
+        return bool(self.redoStack)
+
+    def undoLabel(self):
+        """Returns the label of the last committed step"""
+        return self.undoStack[-1].label if self.undoStack else None
+
+    def redoLabel(self):
+        """Returns the label of the step redo() would redo"""
+        return self.redoStack[-1].label if self.redoStack else None
+
+    def undo(self):
+        """Undoes the last step; returns the rows it changed"""
+        self.commit()
+        if not self.undoStack: return []
+        command = self.undoStack.pop()
+        self.redoStack.append(command)
+        return self.apply(inverseDeltas(command.deltas))
+
+    def redo(self):
+        """Redoes the last undone step; returns the rows it changed"""
+        if not self.redoStack: return []
+        command = self.redoStack.pop()
+        self.undoStack.append(command)
+        return self.apply(command.deltas)
+
+    def apply(self, deltas):
+        """Makes the changes of some deltas without recording them as new edits"""
+        challenges = self.file.challenges
+        rows = set()
+        self.applying = True
+        try:
+            for index, name, old, new in iterDeltas(deltas):
+                setattr(challenges[index], name, new)
+                rows.add(index)
+        finally:
+            self.applying = False
+        if self.autosave is not None:
+            self.autosave.append(deltas)
+        self.notify()
+        return sorted(rows)
+
+    def applyExternal(self, function):
+        """Runs function(), which changes the file to match changes made by
+        another program, without recording them; returns what it returns"""
+        self.commit()
+        self.applying = True
+        try:
+            return function()
+        finally:
+            self.applying = False
+
+    def restartAutosave(self, checksum, changes):
+        """Starts a new autosave log for data with this checksum, holding the
+        field changes (see merge.diffData) from it that are still unsaved"""
+        if self.autosave is None: return
+        self.autosave.clear(checksum)
+        deltas = array.array('q')
+        for change in changes:
+            if change.index is not None and change.name in FieldNumbers:
+                deltas.extend((change.index, FieldNumbers[change.name], change.old, change.new))
+        self.autosave.append(deltas)
+
+    def recover(self, log):
+        """Redoes the edits of an autosave log as one undoable step"""
+        deltas = array.array('q')
+        for part in log:
+            deltas.extend(part)
+        if not deltas: return []
+        self.undoStack.append(Command('Recover autosaved edits', deltas))
+        self.redoStack = []
+        return self.apply(deltas)
+
+    def notify(self):
+        """Tells the listeners something changed"""
+        for listener in self.listeners:
+            listener()
+
+
+# The autosave log, <file>.autosave, starts with a magic and the CRC32 of the
+# file data the edits were made to. Each committed, undone or redone step
+# is appended as a record: a delta count, the deltas and the record's CRC32.
+# A record cut short by a crash fails its check and ends the log.
+AutosaveMagic = b'EXA1'
+AutosaveHeader = struct.Struct('>4sI')
+DeltaStruct = struct.Struct('>IIqq')
+
+def dataChecksum(data):
+    """Returns the checksum an autosave log records for file data"""
+    return zlib.crc32(data) & 0xFFFFFFFF
+
+
+class Autosave():
+    """Append-only log of the edits made to a file since it was last saved"""
+    def __init__(self, fp, checksum, length=None):
+        """Logs to <fp>.autosave. Pass the length of the valid part of an
+        existing log (see readAutosave) to carry on after it."""
+        self.path = fp + '.autosave'
+        self.checksum = checksum
+        self.file = None
+        if length is not None:
+            self.file = open(self.path, 'r+b')
+            self.file.seek(length)
+            self.file.truncate()
+
+    def append(self, deltas):
+        """Appends the deltas of a step"""
+        if not deltas: return
+        if self.file is None:
+            self.file = open(self.path, 'wb')
+            self.file.write(AutosaveHeader.pack(AutosaveMagic, self.checksum))
+
+        body = bytearray(struct.pack('>I', len(deltas) // 4))
+        for i in range(0, len(deltas), 4):
+            body += DeltaStruct.pack(*deltas[i:i + 4])
+        self.file.write(body + struct.pack('>I', zlib.crc32(body) & 0xFFFFFFFF))
+        # Flushed to the OS, which keeps it if the editor crashes
+        self.file.flush()
+
+    def clear(self, checksum):
+        """Removes the log after the file was saved; checksum is of the saved data"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.checksum = checksum
+
+    def close(self):
+        """Closes the log, leaving it on disk"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def readAutosave(fp, checksum):
+    """Reads <fp>.autosave if it was made for data with this checksum.
+    Returns (list of delta arrays, length of the valid part), or None."""
+    path = fp + '.autosave'
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        log = file.read()
+    if len(log) < AutosaveHeader.size or AutosaveHeader.unpack_from(log, 0) != (AutosaveMagic, checksum):
+        return None
+
+    steps = []
+    pos = AutosaveHeader.size
+    while pos + 4 <= len(log):
+        count = struct.unpack_from('>I', log, pos)[0]
+        end = pos + 4 + (count * DeltaStruct.size)
+        if end + 4 > len(log) or struct.unpack_from('>I', log, end)[0] != zlib.crc32(log[pos:end]) & 0xFFFFFFFF:
+            break
+        deltas = array.array('q')
+        for i in range(count):
+            deltas.extend(DeltaStruct.unpack_from(log, pos + 4 + (i * DeltaStruct.size)))
+        steps.append(deltas)
+        pos = end + 4
+    return steps, pos
@@ -0,0 +1,105 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Challenge Editor - Edits NSMBU's challenge data file.
+# Copyright (C) 2016 Grop
+
+# instrument.py
+# Opt-in timing of the editor's main paths. Off unless the CHALLENGE_EDITOR_PROFILE
+# environment variable is set or main.py is given --profile; when off, a timed
+# function costs one flag check per call. Records the wall time and the change
+# in allocated memory blocks of each call, as totals per path and as events
+# that can be saved as a Chrome trace (chrome://tracing, Perfetto).
+
+################################################################
+################################################################
+
+import collections
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+Enabled = bool(os.environ.get('CHALLENGE_EDITOR_PROFILE'))
+TracePath = None # written when the program exits, if set
+
+Stats = collections.OrderedDict() # path -> [calls, total seconds, max seconds, allocated blocks]
+Events = collections.deque(maxlen=100000) # (path, start, duration, blocks, thread id)
+Lock = threading.Lock()
+Origin = time.perf_counter()
+
+
+def enable(tracePath=None):
+    """Turns timing on; if tracePath is given, the trace is saved there on exit"""
+    global Enabled, TracePath
+    Enabled = True
+    if tracePath is not None:
+        if TracePath is None:
+            import atexit
+            atexit.register(lambda: saveTrace(TracePath))
+        TracePath = tracePath
+
+
+def timed(path):
+    """Decorator that records the calls of a function under a path name"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not Enabled:
+                return function(*args, **kwargs)
+            blocks = sys.getallocatedblocks()
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(path, start, time.perf_counter() - start, sys.getallocatedblocks() - blocks)
+        return wrapper
+    return decorator
+
+
+def record(path, start, duration, blocks):
+    """Adds one call to the totals and the trace"""
+    with Lock:
+        stats = Stats.get(path)
+        if stats is None:
+            stats = Stats[path] = [0, 0.0, 0.0, 0]
+        stats[0] += 1
+        stats[1] += duration
+        stats[2] = max(stats[2], duration)
+        stats[3] += blocks
+        Events.append((path, start, duration, blocks, threading.get_ident()))
+
+
+def reset():
+    """Forgets everything recorded so far"""
+    with Lock:
+        Stats.clear()
+        Events.clear()
+
+
+def summary():
+    """Returns a list of (path, calls, total, mean, max, blocks per call), in seconds"""
+    with Lock:
+        return [(path, calls, total, total / calls, longest, blocks / calls) for path, (calls, total, longest, blocks) in Stats.items()]
+
+
+def trace():
+    """Returns the recorded events and totals in Chrome's trace event format"""
+    with Lock:
+        events = list(Events)
+    pid = os.getpid()
+    return {
+        'traceEvents': [{'name': path, 'ph': 'X', 'ts': (start - Origin) * 1e6, 'dur': duration * 1e6, 'pid': pid, 'tid': tid, 'args': {'allocated blocks': blocks}}
+            for path, start, duration, blocks, tid in events],
+        'displayTimeUnit': 'ms',
+        'stats': dict((path, {'calls': calls, 'total': total, 'mean': mean, 'max': longest, 'blocks per call': blocks})
+            for path, calls, total, mean, longest, blocks in summary()),
+        }
+
+
+def saveTrace(fp):
+    """Writes the trace to a JSON file"""
+    with open(fp, 'w') as file:
+        json.dump(trace(), file)
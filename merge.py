@@ -0,0 +1,251 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Challenge Editor - Edits NSMBU's challenge data file.
+# Copyright (C) 2016 Grop
+
+# merge.py
+# Diffs and three-way merges challenge data files. Works on the raw data:
+# records are compared as bytes, and only records that differ are unpacked.
+# Files in another layout than the new (or our) one are converted to it first.
+
+################################################################
+################################################################
+
+import argparse
+import collections
+import struct
+import sys
+
+from exbin import BigEndian, FieldNames, HeaderSize, convertData, detectLayout, readFile, recordCount, writeAtomic
+
+# index is None for the header and trailer. For a record that only one of
+# the files has, name is None and old/new are its data (or None). So are a
+# conflict's base/ours/theirs for a record added or removed on one side.
+Change = collections.namedtuple('Change', 'index name old new')
+Conflict = collections.namedtuple('Conflict', 'index name base ours theirs')
+
+HeaderNames = ('header[0]', 'header[1]', 'header[2]', 'header[3]')
+
+
+def records(data, layout=BigEndian):
+    """Returns a file's data as a list of record buffers"""
+    view = memoryview(data)
+    stride = layout.stride
+    return [view[HeaderSize + (i * stride):HeaderSize + ((i + 1) * stride)] for i in range(recordCount(len(data), stride))]
+
+
+def trailer(data, layout=BigEndian):
+    """Returns the data after a file's last record"""
+    return bytes(data[HeaderSize + (recordCount(len(data), layout.stride) * layout.stride):])
+
+
+def inLayout(data, layout):
+    """Returns file data converted to a layout, if it is clearly in another one"""
+    source = detectLayout(data, default=layout)
+    return data if source is layout else convertData(data, source, layout)
+
+
+def diffValues(index, names, old, new):
+    """Returns the changes between two tuples of values"""
+    return [Change(index, name, a, b) for name, a, b in zip(names, old, new) if a != b]
+
+
+def diffData(old, new):
+    """Returns the changes from one file's data to another's"""
+    if old == new:
+        return []
+    layout = detectLayout(new)
+    old = inLayout(old, layout)
+    unpack = layout.entryStruct.unpack
+
+    changes = diffValues(None, HeaderNames, layout.headerStruct.unpack_from(old, 0), layout.headerStruct.unpack_from(new, 0))
+
+    oldrecords = records(old, layout)
+    newrecords = records(new, layout)
+    for i, (a, b) in enumerate(zip(oldrecords, newrecords)):
+        if a != b:
+            changes += diffValues(i, FieldNames, unpack(a), unpack(b))
+    for i in range(len(newrecords), len(oldrecords)):
+        changes.append(Change(i, None, bytes(oldrecords[i]), None))
+    for i in range(len(oldrecords), len(newrecords)):
+        changes.append(Change(i, None, None, bytes(newrecords[i])))
+
+    if trailer(old, layout) != trailer(new, layout):
+        changes.append(Change(None, 'trailer', trailer(old, layout), trailer(new, layout)))
+    return changes
+
+
+def mergeValue(index, name, base, ours, theirs, conflicts):
+    """Merges one value; on a conflict, keeps ours and records it"""
+    if ours == theirs or base == theirs:
+        return ours
+    if base == ours:
+        return theirs
+    conflicts.append(Conflict(index, name, base, ours, theirs))
+    return ours
+
+
+def mergeData(base, ours, theirs):
+    """Three-way merges the data of three files. Returns the merged data and a
+    list of conflicts; where there is a conflict the merged data keeps ours,
+    and it is in our layout."""
+    conflicts = []
+    layout = detectLayout(ours)
+    base = inLayout(base, layout)
+    theirs = inLayout(theirs, layout)
+    header = layout.headerStruct
+    entry = layout.entryStruct
+
+    merged = bytearray(header.pack(*[mergeValue(None, name, b, o, t, conflicts) for name, b, o, t in
+        zip(HeaderNames, header.unpack_from(base, 0), header.unpack_from(ours, 0), header.unpack_from(theirs, 0))]))
+
+    baserecords = records(base, layout)
+    ourrecords = records(ours, layout)
+    theirrecords = records(theirs, layout)
+    count = mergeValue(None, 'record count', len(baserecords), len(ourrecords), len(theirrecords), conflicts)
+
+    # A record one side removed but the other changed is a conflict too. If
+    # ours is the side that kept it, keep our records.
+    for i in range(count, len(baserecords)):
+        b = baserecords[i]
+        o = ourrecords[i] if i < len(ourrecords) else None
+        t = theirrecords[i] if i < len(theirrecords) else None
+        if (o is not None and o != b) or (t is not None and t != b):
+            conflicts.append(Conflict(i, None, bytes(b), None if o is None else bytes(o), None if t is None else bytes(t)))
+            if o is not None:
+                count = len(ourrecords)
+
+    for i in range(count):
+        b = baserecords[i] if i < len(baserecords) else None
+        o = ourrecords[i] if i < len(ourrecords) else None
+        t = theirrecords[i] if i < len(theirrecords) else None
+
+        if b is None and o is not None and t is not None and o != t:
+            # Both sides added a different record here
+            conflicts.append(Conflict(i, None, None, bytes(o), bytes(t)))
+            merged += o
+        elif o is None or t is None or b is None:
+            # Only some of the files have this record; take it from one that does
+            merged += o if o is not None else t
+        elif o == t or b == t:
+            merged += o
+        elif b == o:
+            merged += t
+        else:
+            # Both sides changed the record; merge it field by field
+            merged += entry.pack(*[mergeValue(i, name, bv, ov, tv, conflicts) for name, bv, ov, tv in
+                zip(FieldNames, entry.unpack(b), entry.unpack(o), entry.unpack(t))])
+
+    merged += mergeValue(None, 'trailer', trailer(base, layout), trailer(ours, layout), trailer(theirs, layout), conflicts)
+    return merged, conflicts
+
+
+def applyChanges(file, changes):
+    """Applies field changes from diffData to a File, so they are tracked as edits.
+    Returns the changes that can't be applied (added/removed records and trailer)."""
+    skipped = []
+    for change in changes:
+        if change.index is None and change.name in HeaderNames:
+            file.header[HeaderNames.index(change.name)] = change.new
+        elif change.index is not None and change.name is not None and change.index < len(file.challenges):
+            setattr(file.challenges[change.index], change.name, change.new)
+        else:
+            skipped.append(change)
+    return skipped
+
+
+def reloadChanges(file, base, new):
+    """Applies the changes from base, the data a File was loaded from, to new,
+    the data on disk now, keeping the File's own edits. Fields it didn't change
+    take the new value and are clean again; where both changed a field, its
+    edit is kept and a Conflict returned. Returns (applied changes, conflicts,
+    skipped changes), the skipped ones being added or removed challenges and
+    trailing data."""
+    applied = []
+    conflicts = []
+    skipped = []
+    for change in diffData(base, new):
+        if change.index is None and change.name in HeaderNames:
+            i = HeaderNames.index(change.name)
+            local = file.header[i]
+            if local == change.old:
+                file.header[i] = change.new
+                applied.append(change)
+            elif local != change.new:
+                conflicts.append(Conflict(None, change.name, change.old, local, change.new))
+            file.savedHeader[i] = change.new
+        elif change.index is not None and change.name is not None and change.index < len(file.challenges):
+            local = getattr(file.challenges[change.index], change.name)
+            if local == change.old:
+                setattr(file.challenges[change.index], change.name, change.new)
+                file.markFieldClean(change.index, change.name)
+                applied.append(change)
+            elif local == change.new:
+                file.markFieldClean(change.index, change.name)
+            else:
+                conflicts.append(Conflict(change.index, change.name, change.old, local, change.new))
+        else:
+            skipped.append(change)
+    return applied, conflicts, skipped
+
+
+def formatChange(change):
+    """Returns a line describing a change"""
+    if change.name is None:
+        return 'Challenge %d: %s' % (change.index + 1, 'added' if change.old is None else 'removed')
+    if change.index is None:
+        if change.name == 'trailer':
+            return 'Trailing data: %d bytes -> %d bytes' % (len(change.old), len(change.new))
+        return '%s: %d -> %d' % (change.name, change.old, change.new)
+    return 'Challenge %d: %s: %d -> %d' % (change.index + 1, change.name, change.old, change.new)
+
+
+def formatConflict(conflict):
+    """Returns a line describing a conflict"""
+    where = 'Challenge %d: ' % (conflict.index + 1) if conflict.index is not None else ''
+    if conflict.name is None:
+        if conflict.base is not None:
+            return '%sremoved on one side and changed on the other' % where
+        return '%sadded differently on both sides' % where
+    if conflict.name == 'trailer':
+        return '%strailing data changed on both sides' % where
+    return '%s%s: base %d, ours %d, theirs %d' % (where, conflict.name, conflict.base, conflict.ours, conflict.theirs)
+
+
+def main(args=None):
+    """Diff/merge tool startup function"""
+    parser = argparse.ArgumentParser(prog='merge.py', description='Diffs and merges NSMBU challenge data files.')
+    sub = parser.add_subparsers(dest='command')
+    sub.required = True
+
+    d = sub.add_parser('diff', help='list the field changes from one file to another')
+    d.add_argument('old')
+    d.add_argument('new')
+
+    m = sub.add_parser('merge', help='three-way merge two edited copies of a file')
+    m.add_argument('base')
+    m.add_argument('ours')
+    m.add_argument('theirs')
+    m.add_argument('-o', '--output', required=True, help='where to write the merged file')
+    args = parser.parse_args(args)
+
+    try:
+        if args.command == 'diff':
+            changes = diffData(readFile(args.old), readFile(args.new))
+            for change in changes:
+                print(formatChange(change))
+            return 1 if changes else 0
+
+        merged, conflicts = mergeData(readFile(args.base), readFile(args.ours), readFile(args.theirs))
+        writeAtomic(args.output, merged)
+    except (OSError, ValueError, struct.error) as e:
+        print('error: %s' % e, file=sys.stderr)
+        return 1
+    for conflict in conflicts:
+        print('conflict: ' + formatConflict(conflict), file=sys.stderr)
+    return 1 if conflicts else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
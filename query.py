@@ -0,0 +1,217 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Challenge Editor - Edits NSMBU's challenge data file.
+# Copyright (C) 2016 Grop
+
+# query.py
+# Indexes over the challenges of a file, kept up to date as they are edited,
+# and the graph of prequels between challenges
+
+################################################################
+################################################################
+
+import ast
+
+from exbin import compileExpression, entryValues, evalExpression, parseExpression
+
+IndexedFields = ('id', 'catid', 'prequel', 'world', 'level', 'area', 'entrance')
+LocationFields = ('world', 'level', 'area', 'entrance')
+
+
+def addRow(index, key, row):
+    """Adds a row to an index"""
+    rows = index.get(key)
+    if rows is None:
+        index[key] = set((row,))
+    else:
+        rows.add(row)
+
+
+def removeRow(index, key, row):
+    """Removes a row from an index"""
+    rows = index[key]
+    rows.discard(row)
+    if not rows:
+        del index[key]
+
+
+def equalityTerms(node):
+    """Yields the (field, value) of each 'field == value' that an expression requires"""
+    if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+        for value in node.values:
+            yield from equalityTerms(value)
+    elif isinstance(node, ast.Compare) and len(node.ops) == 1 and isinstance(node.ops[0], ast.Eq):
+        left, right = node.left, node.comparators[0]
+        if isinstance(right, ast.Name):
+            left, right = right, left
+        if isinstance(left, ast.Name) and left.id in IndexedFields and isinstance(right, ast.Constant) and isinstance(right.value, int):
+            yield left.id, right.value
+
+
+class ChallengeIndex():
+    """Indexes over the challenges of a file, by id, location, category and prequel"""
+    def __init__(self, file):
+        """Builds the indexes and starts following edits to the file"""
+        self.file = file
+        self.indexes = dict((name, {}) for name in IndexedFields)
+        self.locations = {}
+        self.rebuild()
+        file.addObserver(self.fieldChanged)
+
+    def close(self):
+        """Stops following edits to the file"""
+        self.file.removeObserver(self.fieldChanged)
+
+    def rebuild(self):
+        """Rebuilds the indexes from scratch"""
+        for index in self.indexes.values():
+            index.clear()
+        self.locations.clear()
+
+        rows = list(range(len(self.file.challenges)))
+        columns = dict((name, self.file.getColumn(name, rows)) for name in IndexedFields)
+        for name in IndexedFields:
+            index = self.indexes[name]
+            for row, value in zip(rows, columns[name]):
+                addRow(index, value, row)
+        for row, location in enumerate(zip(*[columns[name] for name in LocationFields])):
+            addRow(self.locations, location, row)
+
+    def fieldChanged(self, row, name, old, new):
+        """Moves a challenge within the indexes after one of its fields changed"""
+        index = self.indexes.get(name)
+        if index is None: return
+        removeRow(index, old, row)
+        addRow(index, new, row)
+
+        if name in LocationFields:
+            location = self.location(row)
+            oldlocation = tuple(old if field == name else value for field, value in zip(LocationFields, location))
+            removeRow(self.locations, oldlocation, row)
+            addRow(self.locations, location, row)
+
+    def location(self, row):
+        """Returns the (world, level, area, entrance) of a challenge"""
+        challenge = self.file.challenges[row]
+        return tuple(getattr(challenge, name) for name in LocationFields)
+
+    def lookup(self, name, value):
+        """Returns the rows of the challenges whose field has a value"""
+        return sorted(self.indexes[name].get(value, ()))
+
+    def byId(self, id):
+        """Returns the rows of the challenges with an id"""
+        return self.lookup('id', id)
+
+    def byCategory(self, catid):
+        """Returns the rows of the challenges in a category"""
+        return self.lookup('catid', catid)
+
+    def byPrequel(self, id):
+        """Returns the rows of the challenges whose prequel is an id"""
+        return self.lookup('prequel', id)
+
+    def byLocation(self, world, level, area, entrance):
+        """Returns the rows of the challenges that start at a level, area and entrance"""
+        return sorted(self.locations.get((world, level, area, entrance), ()))
+
+    def select(self, where):
+        """Returns the rows an expression is true for. The 'field == value' terms
+        it requires are looked up in the indexes, and only those rows are checked."""
+        candidates = None
+        for name, value in equalityTerms(parseExpression(where).body):
+            rows = self.indexes[name].get(value, set())
+            candidates = rows if candidates is None else candidates & rows
+        if candidates is None:
+            return self.file.select(where)
+
+        code = compileExpression(where)
+        challenges = self.file.challenges
+        return [row for row in sorted(candidates) if evalExpression(code, entryValues(challenges[row], row))]
+
+    # Prequels. A negative prequel means there is none, and so does 0 unless
+    # a challenge has id 0.
+
+    def refersTo(self, prequel):
+        """Returns whether a prequel value refers to a challenge id"""
+        return prequel > 0 or (prequel == 0 and 0 in self.indexes['id'])
+
+    def prequelOf(self, row):
+        """Returns the row of a challenge's prequel, or None if it has none or it doesn't exist"""
+        prequel = self.file.challenges[row].prequel
+        if not self.refersTo(prequel): return None
+        rows = self.indexes['id'].get(prequel)
+        return min(rows) if rows else None
+
+    def dependents(self, row):
+        """Returns the rows of the challenges that have a challenge as their prequel"""
+        return self.byPrequel(self.file.challenges[row].id)
+
+    def danglingPrequels(self):
+        """Returns the rows of the challenges whose prequel id doesn't exist"""
+        ids = self.indexes['id']
+        rows = []
+        for prequel, dependents in self.indexes['prequel'].items():
+            if self.refersTo(prequel) and prequel not in ids:
+                rows += dependents
+        return sorted(rows)
+
+    def duplicateIds(self):
+        """Returns {id: rows} for the ids used by more than one challenge"""
+        return dict((id, sorted(rows)) for id, rows in self.indexes['id'].items() if len(rows) > 1)
+
+    def cycles(self):
+        """Returns the prequel cycles, each as a list of rows"""
+        state = {} # row -> 1 while being followed, 2 when done
+        cycles = []
+        for start in range(len(self.file.challenges)):
+            path = []
+            row = start
+            while row is not None and row not in state:
+                state[row] = 1
+                path.append(row)
+                row = self.prequelOf(row)
+            if row is not None and state[row] == 1:
+                cycles.append(path[path.index(row):])
+            for row in path:
+                state[row] = 2
+        return cycles
+
+    def unlockOrder(self):
+        """Returns the rows in an order where every challenge comes after its
+        prequel. Challenges in, or unlocked by, a cycle are left out."""
+        order = [row for row in range(len(self.file.challenges)) if self.prequelOf(row) is None]
+        seen = set(order)
+        for row in order:
+            for dependent in self.dependents(row):
+                if dependent not in seen and self.prequelOf(dependent) == row:
+                    seen.add(dependent)
+                    order.append(dependent)
+        return order
+
+
+def prequelReport(index):
+    """Returns a text report of the prequel graph"""
+    challenges = index.file.challenges
+    describe = lambda row: '#%d (id %d)' % (row + 1, challenges[row].id)
+
+    lines = []
+    cycles = index.cycles()
+    if cycles:
+        lines.append('Prequel cycles:')
+        lines += ['  ' + ' -> '.join(describe(row) for row in cycle) for cycle in cycles]
+    dangling = index.danglingPrequels()
+    if dangling:
+        lines.append('Prequels that do not exist:')
+        lines += ['  %s has prequel %d' % (describe(row), challenges[row].prequel) for row in dangling]
+    duplicates = index.duplicateIds()
+    if duplicates:
+        lines.append('Ids used more than once:')
+        lines += ['  id %d: %s' % (id, ', '.join('#%d' % (row + 1) for row in rows)) for id, rows in sorted(duplicates.items())]
+
+    lines.append('Unlock order:')
+    for row in index.unlockOrder():
+        prequel = index.prequelOf(row)
+        lines.append('  %s%s' % (describe(row), '' if prequel is None else ' after #%d' % (prequel + 1)))
+    return '\n'.join(lines)
@@ -0,0 +1,305 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Challenge Editor - Edits NSMBU's challenge data file.
+# Copyright (C) 2016 Grop
+
+# report.py
+# Statistics over many challenge data files at once, written as HTML or CSV:
+# medal thresholds per category, time limits per world, star counts, and the
+# values each unknown field takes, to help work out what they mean. Files are
+# read in worker processes a batch at a time, and every statistic is computed
+# over whole NumPy columns of all the records.
+
+################################################################
+################################################################
+
+import argparse
+import collections
+import concurrent.futures
+import csv
+import html
+import os
+import sys
+
+from exbin import Categories, EntryFields, HeaderSize, Layout, detectLayout, loadNumpy, readFile, recordCount
+import exbin
+
+Formats = {'.html': 'html', '.htm': 'html', '.csv': 'csv'}
+
+# Files read by a worker at a time
+FilesPerBatch = 64
+
+# Records are gathered in native byte order, whatever the files are in
+Native = Layout('native', '=')
+
+Percentiles = (0, 10, 50, 90, 100)
+PercentileNames = ('min', 'p10', 'median', 'p90', 'max')
+
+UnknownNames = tuple(field.name for field in EntryFields if field.name.startswith('unk'))
+
+Table = collections.namedtuple('Table', 'name title columns rows')
+
+
+def checkNumpy():
+    """Makes sure NumPy is there"""
+    if not loadNumpy():
+        raise ValueError('reports need NumPy')
+
+
+def readBatch(files):
+    """Reads some files; returns (records, records per file, layout names,
+    errors), with the records of all of them in one native array. Files
+    that can't be read have no records and an error message."""
+    checkNumpy()
+    numpy = exbin.numpy
+    parts = []
+    counts = []
+    layouts = []
+    errors = []
+    for fp in files:
+        try:
+            data = readFile(fp)
+            if len(data) < HeaderSize:
+                raise ValueError('file is shorter than its header')
+        except (OSError, ValueError) as e:
+            counts.append(0)
+            layouts.append(None)
+            errors.append(str(e))
+            continue
+        layout = detectLayout(data)
+        records = numpy.frombuffer(data, layout.dtype(), recordCount(len(data), layout.stride), HeaderSize)
+        parts.append(records.astype(Native.dtype()))
+        counts.append(len(records))
+        layouts.append(layout.name)
+        errors.append(None)
+    records = numpy.concatenate(parts) if parts else numpy.zeros(0, Native.dtype())
+    return records, counts, layouts, errors
+
+
+class Corpus():
+    """The records of many files, as one array"""
+    def __init__(self, files, records, counts, layouts, errors):
+        """Initialises the corpus; see readCorpus"""
+        numpy = exbin.numpy
+        self.files = files
+        self.records = records
+        self.counts = counts
+        self.layouts = layouts
+        self.errors = errors
+        # The index in files of each record's file
+        self.fileIndex = numpy.repeat(numpy.arange(len(files), dtype=numpy.int64), counts)
+
+    def column(self, name):
+        """Returns a field of every record, as 64-bit ints"""
+        return self.records[name].astype(exbin.numpy.int64)
+
+
+def readCorpus(files, jobs=None):
+    """Reads the records of some files, in worker processes"""
+    checkNumpy()
+    numpy = exbin.numpy
+    batches = [files[i:i + FilesPerBatch] for i in range(0, len(files), FilesPerBatch)]
+    if len(batches) > 1 and jobs != 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(readBatch, batches))
+    else:
+        results = [readBatch(batch) for batch in batches]
+
+    records = numpy.concatenate([result[0] for result in results]) if results else numpy.zeros(0, Native.dtype())
+    counts = [count for result in results for count in result[1]]
+    layouts = [layout for result in results for layout in result[2]]
+    errors = [error for result in results for error in result[3]]
+    return Corpus(files, records, counts, layouts, errors)
+
+
+def categoryName(catid):
+    """Returns the name of a category"""
+    return Categories[catid] if 0 <= catid < len(Categories) else 'Category %d' % catid
+
+
+def describe(values):
+    """Returns the percentiles and mean of some values"""
+    numpy = exbin.numpy
+    ordered = numpy.sort(values)
+    picks = numpy.rint(numpy.array(Percentiles) / 100.0 * (len(ordered) - 1)).astype(numpy.intp)
+    return ordered[picks].tolist() + [round(float(values.mean()), 2)]
+
+
+def groups(keys):
+    """Returns (key, row indices) for each distinct key, sorting once"""
+    numpy = exbin.numpy
+    order = numpy.argsort(keys, kind='stable')
+    distinct, starts = numpy.unique(keys[order], return_index=True)
+    return list(zip(distinct.tolist(), numpy.split(order, starts[1:])))
+
+
+# Tables
+
+def summaryTable(corpus):
+    """Returns how many files and records were read"""
+    rows = [
+        ('files', len(corpus.files)),
+        ('unreadable files', sum(1 for error in corpus.errors if error is not None)),
+        ('challenges', len(corpus.records)),
+        ]
+    for name, count in sorted(collections.Counter(layout for layout in corpus.layouts if layout is not None).items()):
+        rows.append(('%s-endian files' % name, count))
+    return Table('summary', 'Summary', ('what', 'count'), rows)
+
+
+def medalTable(corpus):
+    """Returns the spread of each medal threshold per category"""
+    rows = []
+    medals = [(medal, corpus.column(medal)) for medal in ('bronzeminimum', 'silverminimum', 'goldenminimum')]
+    for catid, rowsOf in groups(corpus.column('catid')):
+        for medal, values in medals:
+            rows.append([catid, categoryName(catid), medal, len(rowsOf)] + describe(values[rowsOf]))
+    return Table('medals', 'Medal thresholds per category', ('catid', 'category', 'medal', 'challenges') + PercentileNames + ('mean',), rows)
+
+
+def timeTable(corpus):
+    """Returns the spread of the time limits per world"""
+    time = corpus.column('time')
+    rows = [[world + 1, len(rowsOf)] + describe(time[rowsOf]) for world, rowsOf in groups(corpus.column('world'))]
+    return Table('times', 'Time limits per world', ('world', 'challenges') + PercentileNames + ('mean',), rows)
+
+
+def starTable(corpus):
+    """Returns how many challenges have each star count, in all and per category"""
+    numpy = exbin.numpy
+    stars = corpus.column('stars')
+    catids = corpus.column('catid')
+    distinctCatids = numpy.unique(catids)
+    rows = []
+    for count, rowsOf in groups(stars):
+        perCategory = numpy.bincount(numpy.searchsorted(distinctCatids, catids[rowsOf]), minlength=len(distinctCatids))
+        rows.append([count, len(rowsOf), round(len(rowsOf) / len(stars), 4)] + perCategory.tolist())
+    return Table('stars', 'Star counts', ('stars', 'challenges', 'share') + tuple(categoryName(int(catid)) for catid in distinctCatids), rows)
+
+
+def valueCounts(values, fileIndex):
+    """Returns (values, challenges, files) for each distinct value, most common first"""
+    numpy = exbin.numpy
+    distinct, counts = numpy.unique(values, return_counts=True)
+    if not len(distinct):
+        return distinct, counts, counts
+    # The files a value appears in: count each distinct (value, file) pair
+    # once, with the pair packed into one int64 (values are 32 bits)
+    low = distinct[0]
+    fileCount = int(fileIndex.max()) + 1
+    pairs = numpy.sort((values - low) * fileCount + fileIndex)
+    pairs = pairs[numpy.concatenate(([True], pairs[1:] != pairs[:-1]))]
+    files = numpy.bincount(numpy.searchsorted(distinct, (pairs // fileCount) + low), minlength=len(distinct))
+    order = numpy.argsort(-counts, kind='stable')
+    return distinct[order], counts[order], files[order]
+
+
+def unknownTables(corpus, top):
+    """Returns an overview of the unknown fields, and the most common values of each"""
+    numpy = exbin.numpy
+    total = max(len(corpus.records), 1)
+    catids, catIndex = numpy.unique(corpus.column('catid'), return_inverse=True)
+    overview = []
+    tables = []
+    for name in UnknownNames:
+        values = corpus.column(name)
+        distinct, counts, files = valueCounts(values, corpus.fileIndex)
+        if len(distinct):
+            overview.append((name, len(distinct), int(values.min()), int(values.max()), int(distinct[0]), round(counts[0] / total, 4)))
+        else:
+            overview.append((name, 0, '', '', '', ''))
+
+        # The category each listed value turns up in most, which often says
+        # what it is for: count the (value, category) pairs of the listed values
+        shown = distinct[:top]
+        mostly = []
+        if len(shown):
+            order = numpy.argsort(shown)
+            pos = numpy.searchsorted(shown[order], values).clip(max=len(shown) - 1)
+            hit = shown[order][pos] == values
+            pairs = numpy.bincount(order[pos[hit]] * len(catids) + catIndex[hit], minlength=len(shown) * len(catids))
+            mostly = catids[pairs.reshape(len(shown), len(catids)).argmax(axis=1)].tolist()
+
+        rows = []
+        for value, count, inFiles, catid in zip(shown.tolist(), counts[:top].tolist(), files[:top].tolist(), mostly):
+            rows.append((value, '0x%X' % (value & 0xFFFFFFFF), count, round(count / total, 4), inFiles, categoryName(catid)))
+        tables.append(Table(name, '%s: the %d most common values' % (name, top), ('value', 'hex', 'challenges', 'share', 'files', 'mostly in'), rows))
+
+    return [Table('unknowns', 'Unknown fields', ('field', 'distinct values', 'min', 'max', 'most common', 'share'), overview)] + tables
+
+
+def buildReport(corpus, top=20):
+    """Returns the tables of a report"""
+    return [summaryTable(corpus), medalTable(corpus), timeTable(corpus), starTable(corpus)] + unknownTables(corpus, top)
+
+
+# Output
+
+def writeHtml(dst, tables, title):
+    """Writes the tables as one HTML page"""
+    with open(dst, 'w', encoding='utf-8') as file:
+        file.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>%s</title>\n' % html.escape(title))
+        file.write('<style>body{font-family:sans-serif} table{border-collapse:collapse;margin-bottom:2em} '
+            'th,td{border:1px solid #ccc;padding:2px 8px;text-align:right} th{background:#eee}</style></head><body>\n')
+        file.write('<h1>%s</h1>\n' % html.escape(title))
+        for table in tables:
+            file.write('<h2 id="%s">%s</h2>\n<table>\n<tr>%s</tr>\n' % (table.name, html.escape(table.title), ''.join('<th>%s</th>' % html.escape(str(column)) for column in table.columns)))
+            for row in table.rows:
+                file.write('<tr>%s</tr>\n' % ''.join('<td>%s</td>' % html.escape(str(value)) for value in row))
+            file.write('</table>\n')
+        file.write('</body></html>\n')
+
+
+def writeCsv(dst, tables):
+    """Writes each table to its own CSV file, <dst without .csv>-<table>.csv;
+    returns their paths"""
+    stem = os.path.splitext(dst)[0]
+    paths = []
+    for table in tables:
+        path = '%s-%s.csv' % (stem, table.name)
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(table.columns)
+            writer.writerows(table.rows)
+        paths.append(path)
+    return paths
+
+
+def main(args=None):
+    """Report tool startup function"""
+    from batch import findFiles
+
+    parser = argparse.ArgumentParser(prog='report.py', description='Reports statistics over many NSMBU challenge data files.')
+    parser.add_argument('paths', nargs='+', help='.exbin files, or directories to search for them')
+    parser.add_argument('-o', '--output', required=True, help='file to write (.html, or .csv for one CSV file per table)')
+    parser.add_argument('-f', '--format', choices=sorted(set(Formats.values())), help='format to write (default: from the extension)')
+    parser.add_argument('--top', type=int, default=20, help='most common values to list for each unknown field (default: 20)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (default: all cores)')
+    args = parser.parse_args(args)
+
+    format = args.format or Formats.get(os.path.splitext(args.output)[1].lower())
+    if format is None:
+        parser.error('Unknown format for %s, expected one of %s' % (args.output, ', '.join(sorted(Formats))))
+
+    try:
+        files = list(findFiles(args.paths))
+        corpus = readCorpus(files, args.jobs)
+        tables = buildReport(corpus, args.top)
+        if format == 'html':
+            writeHtml(args.output, tables, 'Challenge data report (%d files)' % len(files))
+        else:
+            writeCsv(args.output, tables)
+    except (OSError, ValueError) as e:
+        print('error: %s' % e, file=sys.stderr)
+        return 1
+
+    for fp, error in zip(corpus.files, corpus.errors):
+        if error is not None:
+            print('%s: error: %s' % (fp, error), file=sys.stderr)
+    print('%d challenge(s) from %d file(s) reported' % (len(corpus.records), len(files)), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
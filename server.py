@@ -0,0 +1,273 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Challenge Editor - Edits NSMBU's challenge data file.
+# Copyright (C) 2016 Grop
+
+# server.py
+# Serves a loaded challenge file to other programs over a local socket, as
+# JSON-RPC 2.0 with one request (or batch) per line. Requests can be sent
+# without waiting for the replies; each line is handled under one lock, so a
+# batch is applied as a whole. Subscribed connections are sent a 'changed'
+# notification with the field changes of each request that made some.
+
+################################################################
+################################################################
+
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+
+from exbin import FieldNames, FieldRanges, File, readFile, replayJournal, writeAtomic
+import merge
+from query import ChallengeIndex
+
+# JSON-RPC error codes
+ParseError = -32700
+InvalidRequest = -32600
+MethodNotFound = -32601
+InvalidParams = -32602
+ServerError = -32000
+
+
+class ChallengeService():
+    """The methods served for one challenge file"""
+    def __init__(self, fp):
+        """Loads the file"""
+        self.fp = fp
+        replayJournal(fp)
+        self.file = File(readFile(fp))
+        self.index = ChallengeIndex(self.file)
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.changes = [] # field changes of the request being handled
+        self.file.addObserver(self.fieldChanged)
+        self.methods = {
+            'info': self.info,
+            'get': self.get,
+            'set': self.set,
+            'query': self.query,
+            'diff': self.diff,
+            'save': self.save,
+            }
+
+    def fieldChanged(self, index, name, old, new):
+        """Remembers a change to tell the subscribers about"""
+        self.changes.append({'index': index, 'name': name, 'old': old, 'new': new})
+
+    def row(self, index):
+        """Checks a challenge index"""
+        # bool is an int subclass, but true isn't a challenge index
+        if type(index) is not int or not 0 <= index < len(self.file.challenges):
+            raise ValueError('no challenge %r' % (index,))
+        return index
+
+    def info(self):
+        """Returns the path, number of challenges and the challenges with unsaved changes"""
+        return {'path': self.fp, 'count': len(self.file.challenges), 'dirty': self.file.dirtyIndices()}
+
+    def get(self, rows=None, fields=None):
+        """Returns [{field: value}] of some challenges (default: all), with their index"""
+        if rows is not None and not isinstance(rows, list):
+            raise ValueError('rows must be a list of challenge indices')
+        if fields is not None and not (isinstance(fields, list) and all(isinstance(name, str) for name in fields)):
+            raise ValueError('fields must be a list of field names')
+        rows = range(len(self.file.challenges)) if rows is None else [self.row(index) for index in rows]
+        fields = FieldNames if fields is None else fields
+        for name in fields:
+            if name not in FieldNames:
+                raise ValueError('no field %r' % (name,))
+        columns = [self.file.getColumn(name, rows) for name in fields]
+        return [dict(zip(('index',) + tuple(fields), values)) for values in zip(rows, *columns)]
+
+    def set(self, index, values):
+        """Sets fields of a challenge; returns how many changed"""
+        challenge = self.file.challenges[self.row(index)]
+        if not isinstance(values, dict):
+            raise ValueError('values must be an object of field values')
+        for name, value in values.items():
+            if name not in FieldNames:
+                raise ValueError('no field %r' % (name,))
+            low, high = FieldRanges[name]
+            if type(value) is not int or not low <= value <= high:
+                raise ValueError('%s must be a number between %d and %d' % (name, low, high))
+        before = len(self.changes)
+        for name, value in values.items():
+            setattr(challenge, name, value)
+        return len(self.changes) - before
+
+    def query(self, where):
+        """Returns the indices of the challenges an expression is true for"""
+        return self.index.select(where)
+
+    def path(self, path):
+        """Checks a path a client asked for, which has to be in the served file's folder"""
+        if path is None:
+            return self.fp
+        if not isinstance(path, str):
+            raise ValueError('path must be a string')
+        folder = os.path.dirname(os.path.realpath(self.fp))
+        full = os.path.realpath(os.path.join(folder, path))
+        if os.path.dirname(full) != folder:
+            raise ValueError('%s is not in the folder of the served file' % path)
+        return full
+
+    def diff(self, path=None):
+        """Returns the changes from a file on disk (default: the served one) to the served data"""
+        changes = merge.diffData(readFile(self.path(path)), self.file.save())
+        return [dict(change._asdict(), old=change.old.hex() if isinstance(change.old, bytes) else change.old,
+            new=change.new.hex() if isinstance(change.new, bytes) else change.new) for change in changes]
+
+    def save(self, path=None):
+        """Writes the changed challenges back (or the whole file to another path
+        in the same folder); returns the writes made"""
+        path = self.path(path)
+        if path == os.path.realpath(self.fp):
+            return self.file.saveIncremental(self.fp)
+        writeAtomic(path, self.file.save())
+        return 1
+
+    def call(self, request):
+        """Handles one JSON-RPC request; returns the response, or None for a notification"""
+        if not isinstance(request, dict) or request.get('jsonrpc') != '2.0' or not isinstance(request.get('method'), str):
+            return errorResponse(request.get('id') if isinstance(request, dict) else None, InvalidRequest, 'Invalid request')
+        if 'id' not in request:
+            # A notification is never answered, not even with an error
+            self.run(request)
+            return None
+        return self.run(request)
+
+    def run(self, request):
+        """Calls the method of a valid request; returns the response"""
+        id = request.get('id')
+        method = self.methods.get(request['method'])
+        if method is None:
+            return errorResponse(id, MethodNotFound, 'Unknown method %s' % request['method'])
+
+        params = request.get('params', {})
+        try:
+            if isinstance(params, dict):
+                result = method(**params)
+            elif isinstance(params, list):
+                result = method(*params)
+            else:
+                return errorResponse(id, InvalidParams, 'params must be an object or array')
+        except (TypeError, ValueError, SyntaxError) as e:
+            return errorResponse(id, InvalidParams, str(e))
+        except Exception as e:
+            return errorResponse(id, ServerError, str(e))
+        return {'jsonrpc': '2.0', 'id': id, 'result': result}
+
+    def handle(self, message):
+        """Handles a request or a batch; returns (reply or None, changes made)"""
+        with self.lock:
+            self.changes = []
+            if isinstance(message, list):
+                if not message:
+                    responses = errorResponse(None, InvalidRequest, 'Empty batch')
+                else:
+                    responses = [response for response in map(self.call, message) if response is not None] or None
+            else:
+                responses = self.call(message)
+            changes = self.changes
+            self.changes = []
+        return responses, changes
+
+    def notify(self, changes):
+        """Sends changes to every subscriber"""
+        if not changes: return
+        message = {'jsonrpc': '2.0', 'method': 'changed', 'params': {'changes': changes}}
+        for connection in list(self.subscribers):
+            connection.send(message)
+
+
+def errorResponse(id, code, message):
+    """Returns a JSON-RPC error response"""
+    return {'jsonrpc': '2.0', 'id': id, 'error': {'code': code, 'message': message}}
+
+
+class Connection(socketserver.StreamRequestHandler):
+    """One client; reads request lines and writes replies in order"""
+    def setup(self):
+        """Prepares for writing from other connections' threads"""
+        socketserver.StreamRequestHandler.setup(self)
+        self.writeLock = threading.Lock()
+
+    def handle(self):
+        """Serves requests until the client disconnects"""
+        service = self.server.service
+        try:
+            for line in self.rfile:
+                if not line.strip(): continue
+                try:
+                    message = json.loads(line)
+                except ValueError as e:
+                    self.send(errorResponse(None, ParseError, str(e)))
+                    continue
+
+                if isinstance(message, dict) and message.get('method') in ('subscribe', 'unsubscribe'):
+                    # These are about the connection, not the file
+                    if message['method'] == 'subscribe':
+                        service.subscribers.add(self)
+                    else:
+                        service.subscribers.discard(self)
+                    if 'id' in message:
+                        self.send({'jsonrpc': '2.0', 'id': message['id'], 'result': True})
+                    continue
+
+                reply, changes = service.handle(message)
+                if reply is not None:
+                    self.send(reply)
+                service.notify(changes)
+        finally:
+            service.subscribers.discard(self)
+
+    def send(self, message):
+        """Writes a message to the client, as one line"""
+        line = json.dumps(message).encode('utf-8') + b'\n'
+        with self.writeLock:
+            try:
+                self.wfile.write(line)
+                self.wfile.flush()
+            except OSError:
+                self.server.service.subscribers.discard(self)
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """TCP server for a ChallengeService"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, service):
+        """Listens on address"""
+        socketserver.TCPServer.__init__(self, address, Connection)
+        self.service = service
+
+
+def main(args=None):
+    """Server startup function"""
+    parser = argparse.ArgumentParser(prog='server.py', description='Serves an NSMBU challenge data file to other programs as JSON-RPC over a local socket.')
+    parser.add_argument('file', help='.exbin file to serve')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('-p', '--port', type=int, default=0, help='port to listen on (default: any free one)')
+    args = parser.parse_args(args)
+
+    service = ChallengeService(args.file)
+    server = Server((args.host, args.port), service)
+    host, port = server.server_address[:2]
+    print('Serving %s on %s:%d' % (args.file, host, port), file=sys.stderr)
+    sys.stderr.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Challenge Editor - Edits NSMBU's challenge data file.
+# Copyright (C) 2016 Grop
+
+# validate.py
+# Checks challenges for values the game won't like. A whole file is checked
+# one rule at a time (over whole columns for a NumpyFile); after that only the
+# challenges and rules an edit touches are checked again.
+
+################################################################
+################################################################
+
+import ast
+import collections
+
+from exbin import BabyYoshis, Categories, FieldNames, Powerups, compileExpression, entryValues, evalExpression, parseExpression
+from query import ChallengeIndex, LocationFields
+
+# expression is true when the challenge has the problem
+Rule = collections.namedtuple('Rule', 'name severity expression message')
+Problem = collections.namedtuple('Problem', 'row rule severity message')
+
+Rules = (
+    Rule('medals', 'error', 'goldenminimum < silverminimum or silverminimum < bronzeminimum', 'Medal minimums should be gold >= silver >= bronze'),
+    Rule('time', 'error', 'time > 999', 'Time is over 999'),
+    Rule('stars', 'warning', 'stars < 1 or stars > 5', 'Stars should be 1-5'),
+    Rule('catid', 'error', 'catid >= %d' % len(Categories), 'Unknown category'),
+    Rule('powerup', 'error', 'powerup >= %d' % len(Powerups), 'Unknown start powerup'),
+    Rule('babyyoshi', 'error', 'babyyoshi >= %d' % len(BabyYoshis), 'Unknown Baby Yoshi'),
+    )
+
+# Rules that compare challenges with each other, checked through the index
+DuplicateId = Rule('duplicate id', 'error', None, 'Another challenge has the same id')
+MissingPrequel = Rule('missing prequel', 'warning', None, 'The prequel id does not exist')
+
+# Checked against a courses.CourseIndex, when there is one
+MissingCourse = Rule('course', 'error', None, 'The level, area or entrance does not exist')
+
+
+def ruleFields(rule):
+    """Returns the fields a rule's expression reads"""
+    return set(node.id for node in ast.walk(parseExpression(rule.expression)) if isinstance(node, ast.Name))
+
+
+class Validator():
+    """Keeps the problems of a file's challenges up to date as it is edited"""
+    def __init__(self, file, index=None, rules=Rules, courses=None):
+        """Checks the whole file and starts following edits to it"""
+        self.file = file
+        self.courses = courses
+        self.ownindex = index is None
+        self.index = ChallengeIndex(file) if index is None else index
+        self.rules = rules
+        self.codes = dict((rule.name, compileExpression(rule.expression)) for rule in rules)
+        self.listeners = [] # called as listener(rows) after the problems of rows changed
+
+        # field -> rules that read it
+        self.rulesByField = dict((name, []) for name in FieldNames)
+        for rule in rules:
+            for name in ruleFields(rule):
+                if name in self.rulesByField:
+                    self.rulesByField[name].append(rule)
+
+        self.problems = {} # (row, rule name) -> Problem
+        self.validateAll()
+        file.addObserver(self.fieldChanged)
+
+    def close(self):
+        """Stops following edits to the file"""
+        self.file.removeObserver(self.fieldChanged)
+        if self.ownindex:
+            self.index.close()
+
+    def validateAll(self):
+        """Checks every challenge against every rule"""
+        self.problems.clear()
+        for rule in self.rules:
+            for row in self.file.select(rule.expression):
+                self.problems[(row, rule.name)] = Problem(row, rule.name, rule.severity, rule.message)
+        for rows in self.index.duplicateIds().values():
+            for row in rows:
+                self.setProblem(row, DuplicateId, True)
+        for row in self.index.danglingPrequels():
+            self.setProblem(row, MissingPrequel, True)
+        self.checkCourses()
+        self.notify(range(len(self.file.challenges)))
+
+    def setCourses(self, courses):
+        """Checks the challenges against another course folder's index, or none"""
+        self.courses = courses
+        self.checkCourses()
+        self.notify(range(len(self.file.challenges)))
+
+    def checkCourses(self):
+        """Checks every challenge's level, area and entrance"""
+        rows = range(len(self.file.challenges))
+        columns = [self.file.getColumn(name, rows) for name in LocationFields]
+        for row, location in zip(rows, zip(*columns)):
+            problem = self.courses.problem(*location) if self.courses is not None else None
+            self.setProblem(row, MissingCourse, problem is not None, problem)
+
+    def setProblem(self, row, rule, present, message=None):
+        """Adds or removes a problem; message replaces the rule's"""
+        if present:
+            self.problems[(row, rule.name)] = Problem(row, rule.name, rule.severity, message or rule.message)
+        else:
+            self.problems.pop((row, rule.name), None)
+
+    def fieldChanged(self, row, name, old, new):
+        """Checks the rules that read a field again, for the challenges it affects"""
+        touched = set((row,))
+        challenge = self.file.challenges[row]
+        if self.rulesByField[name]:
+            values = entryValues(challenge, row)
+            for rule in self.rulesByField[name]:
+                self.setProblem(row, rule, evalExpression(self.codes[rule.name], values))
+
+        if name == 'id':
+            # Challenges that shared the old or share the new id, and those
+            # whose prequel is either of them
+            for id in (old, new):
+                rows = self.index.byId(id)
+                for other in rows:
+                    self.setProblem(other, DuplicateId, len(rows) > 1)
+                touched.update(rows)
+                for other in self.index.byPrequel(id):
+                    self.setProblem(other, MissingPrequel, self.isMissingPrequel(other))
+                    touched.add(other)
+        elif name == 'prequel':
+            self.setProblem(row, MissingPrequel, self.isMissingPrequel(row))
+        elif name in LocationFields and self.courses is not None:
+            problem = self.courses.problem(*self.index.location(row))
+            self.setProblem(row, MissingCourse, problem is not None, problem)
+
+        self.notify(touched)
+
+    def isMissingPrequel(self, row):
+        """Returns whether a challenge's prequel id doesn't exist"""
+        prequel = self.file.challenges[row].prequel
+        return self.index.refersTo(prequel) and not self.index.byId(prequel)
+
+    def notify(self, rows):
+        """Tells the listeners which rows were checked again"""
+        for listener in self.listeners:
+            listener(rows)
+
+    def sortedProblems(self):
+        """Returns all problems, by challenge"""
+        return sorted(self.problems.values())
+
+    def problemsOf(self, row):
+        """Returns the problems of one challenge"""
+        return [problem for (r, name), problem in sorted(self.problems.items()) if r == row]
+
+
+def formatProblem(problem):
+    """Returns a line describing a problem"""
+    return '#%d: %s: %s' % (problem.row + 1, problem.severity, problem.message)